@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+"""Benchmark gigasetelements-cli commands against the local mock API.
+
+Reports wall time, number of HTTP requests and response bytes per command and
+monitor throughput. With --check the results are compared to a budget file and
+the process exits non-zero on regression, which makes it usable in CI.
+"""
+
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    from urllib.parse import urlparse
+except ImportError:
+    from urlparse import urlparse
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, HERE)
+
+from mockapi import MockServer  # noqa: E402 pylint: disable=wrong-import-position
+
+SCENARIOS = [
+    ('status', []),
+    ('sensor', ['-s']),
+    ('plug', ['-g', 'on']),
+    ('modus', ['-m', 'away']),
+    ('settings', ['-m', 'night', '-k', '30', '-y', 'on', '-b', 'arm']),
+    ('record', ['-r', 'AABBCCDDEE00']),
+    ('notifications', ['-z']),
+    ('rules', ['-R']),
+    ('events', ['-e', '50']),
+    ('events-filter', ['-e', '20', '-f', 'door']),
+]
+
+
+def redirect(module, base_url):
+    """Point all API endpoint constants of module at base_url."""
+    for name in dir(module):
+        if name.startswith('URL_'):
+            parts = urlparse(getattr(module, name))
+            setattr(module, name, base_url + parts.path + ('?' + parts.query if parts.query else ''))
+
+
+def run_command(gigaset, server, argv):
+    """Run one CLI invocation in-process and return wall time, requests, bytes and success."""
+    server.state.reset()
+    started = time.time()
+    success = True
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            gigaset.configure(gigaset.parse_args(['-i', '-N', '-u', 'bench@example.com', '-p', 'secret'] + argv))
+            gigaset.base()
+        except SystemExit:
+            success = False
+    return {'wall_ms': round((time.time() - started) * 1000, 1), 'requests': server.state.requests, 'bytes': server.state.bytes,
+            'ok': success}
+
+
+def bench_commands(gigaset, server, home):
+    """Benchmark every scenario with a cold and a warm local state."""
+    results = {}
+    for name, argv in SCENARIOS:
+        for entry in os.listdir(home):
+            os.remove(os.path.join(home, entry))
+        results[name + '-cold'] = run_command(gigaset, server, argv)
+        results[name + '-warm'] = run_command(gigaset, server, argv)
+    return results
+
+
+def bench_monitor(gigaset, server, seconds, rate):
+    """Measure how many generated events the monitor poll loop delivers."""
+    from gigasetelements.poller import EventPoller  # pylint: disable=import-outside-toplevel
+    gigaset.configure(gigaset.parse_args(['-i', '-N', '-u', 'bench@example.com', '-p', 'secret']))
+    with contextlib.redirect_stdout(io.StringIO()):
+        gigaset.authenticate()
+    poller = EventPoller(lambda from_ts, to_ts: gigaset.iter_events(from_ts, to_ts), None)
+    server.state.reset()
+    server.state.event_rate = rate
+    server.state.generated = time.time()
+    generated = len(server.state.events)
+    delivered = 0
+    started = time.time()
+    while time.time() - started < seconds:
+        delivered += len(poller.poll())
+        poller.wait()
+    delivered += len(poller.poll())
+    server.state.event_rate = 0
+    generated = len(server.state.events) - generated
+    return {'monitor': {'wall_ms': round((time.time() - started) * 1000, 1), 'requests': server.state.requests, 'bytes': server.state.bytes,
+                        'events': delivered, 'generated': generated, 'ok': delivered >= generated}}
+
+
+def bench_startup(runs=5):
+    """Measure median time to import the module and parse a command line in a fresh interpreter."""
+    code = "import gigasetelements.gigasetelements as g; g.parse_args(['-i', '-u', 'a', '-p', 'b', '-g', 'on'])"
+    timings = []
+    for _ in range(runs):
+        started = time.time()
+        subprocess.check_call([sys.executable, '-c', code], cwd=ROOT)
+        timings.append(time.time() - started)
+    return {'startup': {'wall_ms': round(sorted(timings)[runs // 2] * 1000, 1), 'requests': 0, 'bytes': 0, 'ok': True}}
+
+
+def check(results, budgetfile):
+    """Compare results with budget and return list of violations."""
+    with open(budgetfile) as target:
+        budget = json.load(target)
+    violations = []
+    for name, limits in sorted(budget.items()):
+        result = results.get(name)
+        if result is None:
+            violations.append(name + ': missing')
+            continue
+        if not result['ok']:
+            violations.append(name + ': failed')
+        for metric, limit in sorted(limits.items()):
+            if result.get(metric, 0) > limit:
+                violations.append('%s: %s %s exceeds budget %s' % (name, metric, result[metric], limit))
+    return violations
+
+
+def main():
+    """Run benchmarks."""
+    parser = argparse.ArgumentParser(description='Benchmark gigasetelements-cli against a local mock API')
+    parser.add_argument('--latency', type=float, default=0.02, help='mock latency per request in seconds')
+    parser.add_argument('--rate', type=float, default=20.0, help='events per second generated during monitor benchmark')
+    parser.add_argument('--duration', type=float, default=5.0, help='monitor benchmark duration in seconds')
+    parser.add_argument('--history', type=int, default=2000, help='number of past events on mock server')
+    parser.add_argument('--json', help='write results to file')
+    parser.add_argument('--check', help='budget file to compare results with', nargs='?', const=os.path.join(HERE, 'budget.json'))
+    options = parser.parse_args()
+
+    home = tempfile.mkdtemp(prefix='gigasetelements-bench-')
+    os.environ['HOME'] = home
+    workdir = os.getcwd()
+    os.chdir(home)
+    import gigasetelements.gigasetelements as gigaset  # pylint: disable=import-outside-toplevel
+
+    server = MockServer(latency=options.latency).start()
+    server.state.add_events(options.history, time.time() - options.history * 60, 60)
+    redirect(gigaset, server.url)
+    try:
+        results = bench_commands(gigaset, server, home)
+        results.update(bench_monitor(gigaset, server, options.duration, options.rate))
+        results.update(bench_startup())
+    finally:
+        server.shutdown()
+        os.chdir(workdir)
+        shutil.rmtree(home, ignore_errors=True)
+
+    print('%-22s %10s %9s %10s' % ('command', 'wall ms', 'requests', 'bytes'))
+    for name in sorted(results):
+        result = results[name]
+        print('%-22s %10.1f %9d %10d%s' % (name, result['wall_ms'], result['requests'], result['bytes'], '' if result['ok'] else '  FAILED'))
+    if options.json:
+        with open(options.json, 'w') as target:
+            json.dump(results, target, indent=4, sort_keys=True)
+    if options.check:
+        violations = check(results, options.check)
+        for violation in violations:
+            print('REGRESSION ' + violation)
+        sys.exit(1 if violations else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+"""Benchmark JSON decoding of API payloads and writing of the elements dump.
+
+Compares the stdlib path used before (requests' json() on the decoded text)
+with gigasetelements.jsonlib on the backend installed here for full event
+pages and a large elements payload. For the elements dump the previous
+Python 2 / Windows path, which built the whole document as one string, and
+the previous json.dump are compared with jsonlib.dump. Peak
+memory of the dump is measured separately with tracemalloc.
+"""
+
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+from mockapi import MockState  # noqa: E402 pylint: disable=wrong-import-position
+from gigasetelements import jsonlib  # noqa: E402 pylint: disable=wrong-import-position
+
+
+def payloads(events, elements):
+    """Return encoded event page and elements payload."""
+    state = MockState()
+    state.add_events(events)
+    page = json.dumps({'events': state.events}).encode('utf-8')
+    subelements = []
+    for index in range(elements):
+        subelement = dict(state.elements()['bs01'][0]['subelements'][0])
+        subelement.update({'id': 'bs01.cl01.%04d' % index, 'friendlyName': 'Climate é %d' % index,
+                           'history': [{'ts': i, 'temperature': 20.5 + i / 10.0, 'humidity': 45.0} for i in range(50)]})
+        subelements.append(subelement)
+    document = json.dumps({'bs01': [{'id': 'BS1', 'subelements': subelements}]}).encode('utf-8')
+    return page, document
+
+
+def per_call(func, repeat):
+    """Return best time per call in milliseconds."""
+    return min(timeit.repeat(func, number=1, repeat=repeat)) * 1000
+
+
+def dump_cost(func, data):
+    """Return milliseconds and peak traced memory in KB of writing data to a temporary file."""
+    directory = tempfile.mkdtemp(prefix='gigasetelements-json-')
+    fileloc = os.path.join(directory, 'elements.json')
+    results = []
+    for traced in (False, False, False, True):
+        if traced:
+            tracemalloc.start()
+        started = time.time()
+        with io.open(fileloc, 'w', encoding='utf-8') as target:
+            func(data, target)
+        results.append((time.time() - started) * 1000)
+        if traced:
+            results[-1] = tracemalloc.get_traced_memory()[1] / 1024
+            tracemalloc.stop()
+    os.remove(fileloc)
+    os.rmdir(directory)
+    return min(results[:-1]), results[-1]
+
+
+def main():
+    """Run benchmark."""
+    parser = argparse.ArgumentParser(description='Benchmark JSON decoding and elements dump')
+    parser.add_argument('--events', type=int, default=500, help='events per page')
+    parser.add_argument('--elements', type=int, default=1000, help='number of subelements')
+    parser.add_argument('--repeat', type=int, default=20, help='timing repetitions')
+    options = parser.parse_args()
+
+    page, document = payloads(options.events, options.elements)
+    elements = json.loads(document.decode('utf-8'))
+    print('backend: ' + jsonlib.BACKEND)
+    print('%-34s %12s %12s' % ('case', 'before', 'after'))
+    for name, body in (('decode event page (%d KB)' % (len(page) // 1024), page), ('decode elements (%d KB)' % (len(document) // 1024), document)):
+        before = per_call(lambda: json.loads(body.decode('utf-8')), options.repeat)
+        after = per_call(lambda: jsonlib.loads(body), options.repeat)
+        print('%-34s %9.2f ms %9.2f ms' % (name, before, after))
+    after = dump_cost(jsonlib.dump, elements)
+    for name, func in (('dump elements (whole string)', lambda data, target: target.write(json.dumps(data, indent=4, ensure_ascii=False))),
+                       ('dump elements (json.dump)', lambda data, target: json.dump(data, target, indent=4, ensure_ascii=False))):
+        before = dump_cost(func, elements)
+        print('%-34s %9.2f ms %9.2f ms' % (name, before[0], after[0]))
+        print('%-34s %9.0f KB %9.0f KB' % ('  peak memory', before[1], after[1]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,269 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+"""Local stand-in for the Gigaset Elements cloud API used by benchmarks."""
+
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+
+import argparse
+import json
+import random
+import threading
+import time
+
+try:
+    from urllib.parse import urlparse, parse_qs
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from urlparse import urlparse, parse_qs
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+
+GROUPS = {'open': ('door', 'ds02'), 'close': ('door', 'ds02'), 'tilt': ('window', 'ws02'), 'movement': ('motion', 'ps02'),
+          'on': ('plug', 'sp02'), 'off': ('plug', 'sp02'), 'button1': ('button', 'bn01'), 'smoke_detected': ('smoke', 'sd01')}
+
+SENSORS = [{'id': '0123abcd%02d' % i, 'type': t, 'friendly_name': '%s %d' % (t, i), 'status': 'online', 'firmware_status': 'up_to_date',
+            'battery': {'state': 'ok'}, 'position_status': 'closed'} for i, t in enumerate(['ds02', 'ws02', 'ps02', 'sp02', 'is01', 'bn01'])]
+
+CAMERAS = [{'id': 'AABBCCDDEE%02d' % i, 'friendly_name': 'Camera %d' % i, 'status': 'online', 'firmware_status': 'up_to_date',
+            'settings': {'quality': 'hd', 'nightmode': 'auto', 'mic': 'on', 'connection': 'wifi'},
+            'motion_detection': {'status': 'on'}, 'wifi_ssid': 'home'} for i in range(2)]
+
+
+class MockState(object):
+    """Mutable state of the mock installation and request accounting."""
+
+    def __init__(self, latency=0.0, event_rate=0.0):
+        self.latency = latency
+        self.event_rate = event_rate
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.bytes = 0
+        self.paths = {}
+        self.events = []
+        self.mode = 'home'
+        self.recording = {}
+        self.started = time.time()
+        self.generated = self.started
+        self.outage = 0
+        self.reject_merged = False
+        self.hooked = []
+
+    def account(self, path, size):
+        """Record one served request."""
+        with self.lock:
+            self.requests += 1
+            self.bytes += size
+            self.paths[path] = self.paths.get(path, 0) + 1
+
+    def reset(self):
+        """Reset request accounting."""
+        with self.lock:
+            self.requests = 0
+            self.bytes = 0
+            self.paths = {}
+
+    def add_events(self, count, ts=None, spacing=1.0):
+        """Append count synthetic events starting at ts spaced by given seconds."""
+        with self.lock:
+            start = int((ts or time.time()) * 1000)
+            for index in range(count):
+                now = start + int(index * spacing * 1000)
+                etype = random.choice(list(GROUPS))
+                group, otype = GROUPS[etype]
+                sensor = [x for x in SENSORS if x['type'] == otype] or SENSORS[:1]
+                self.events.append({'id': '%016x' % random.getrandbits(64), 'ts': str(now), 'type': etype, 'group': group,
+                                    'source_type': 'basestation', 'source_id': 'BS1',
+                                    'o': {'type': otype, 'friendly_name': sensor[0]['friendly_name'], 'id': sensor[0]['id']}})
+
+    def tick(self):
+        """Generate events according to configured rate."""
+        if self.event_rate <= 0:
+            return
+        now = time.time()
+        due = int((now - self.generated) * self.event_rate)
+        if due:
+            self.add_events(due, self.generated, 1.0 / self.event_rate)
+            self.generated += due / self.event_rate
+
+    def elements(self):
+        """Return elements payload."""
+        subelements = [{'id': 'bs01.cl01.%02d' % i, 'type': 'bs01.cl01', 'friendlyName': 'Climate %d' % i, 'connectionStatus': 'online',
+                        'firmwareStatus': 'up_to_date', 'batteryStatus': 'ok',
+                        'states': {'temperature': 20 + random.random(), 'humidity': 45 + random.random()}} for i in range(3)]
+        return {'bs01': [{'id': 'BS1', 'subelements': subelements}]}
+
+    def basestation(self):
+        """Return basestation payload."""
+        return [{'id': 'BS1', 'friendly_name': 'Basestation', 'status': 'online', 'firmware_status': 'up_to_date',
+                 'intrusion_settings': {'active_mode': self.mode, 'modes': []}, 'sensors': SENSORS}]
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    """Serve the subset of the API used by gigasetelements-cli."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        return
+
+    def reply(self, body, code=200, ctype='application/json', cookie=None):
+        """Send response and account for it."""
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', ctype)
+        self.send_header('Content-Length', str(len(body)))
+        if cookie:
+            self.send_header('Set-Cookie', cookie + '; Path=/')
+        self.end_headers()
+        self.server.state.account(urlparse(self.path).path, len(body))
+        self.wfile.write(body)
+
+    def authorized(self):
+        """Check session cookie."""
+        return 'usertoken=valid' in self.headers.get('Cookie', '')
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Handle GET requests."""
+        state = self.server.state
+        time.sleep(state.latency)
+        state.tick()
+        url = urlparse(self.path)
+        path = url.path
+        query = dict((k, v[0]) for k, v in parse_qs(url.query).items())
+        if path == '/stats':
+            return self.reply({'requests': state.requests, 'bytes': state.bytes, 'paths': state.paths, 'events': len(state.events)})
+        if time.time() < state.outage:
+            return self.reply({'message': 'unavailable'}, 503)
+        if path == '/api/v1/status':
+            return self.reply({'isMaintenance': False})
+        if path == '/api/v1/auth/openid/begin':
+            return self.reply(b'ok', ctype='text/html', cookie='usertoken=valid')
+        if path == '/pypi/gigasetelements-cli/json':
+            return self.reply({'info': {'version': '2000.1.0'}})
+        if not self.authorized():
+            return self.reply({'message': 'unauthorized'}, 401)
+        if path == '/api/v1/me/basestations':
+            return self.reply(state.basestation())
+        if path.endswith('/rules'):
+            return self.reply([{'friendly_name': 'Rule', 'active': True, 'friendly_description': 'Plug on at night'}])
+        if path == '/api/v1/me/cameras':
+            return self.reply(CAMERAS)
+        if path.startswith('/api/v1/me/cameras/'):
+            return self.camera(path.split('/')[5], path.split('/', 6)[-1])
+        if path == '/api/v2/me/health':
+            return self.reply({'system_health': 'green', 'status_msg_id': ''})
+        if path == '/api/v2/me/elements':
+            return self.reply(state.elements())
+        if path == '/api/v1/me/notifications/users/channels':
+            return self.reply({'gcm': [{'friendlyName': 'Phone', 'status': 'ok', 'notificationGroups': ['door', 'motion']}]})
+        if path == '/api/v2/me/events':
+            return self.reply({'events': self.events(query)})
+        return self.reply({'message': 'not found'}, 404)
+
+    def events(self, query):
+        """Select events newest first honoring from_ts, to_ts, group and limit."""
+        state = self.server.state
+        from_ts = int(query.get('from_ts', 0))
+        to_ts = int(query.get('to_ts', 2 ** 62))
+        limit = int(query.get('limit', 10))
+        group = query.get('group')
+        with state.lock:
+            selected = [e for e in reversed(state.events) if from_ts <= int(e['ts']) <= to_ts and group in (None, e['group'])]
+        return selected[:limit]
+
+    def camera(self, mac, action):
+        """Handle camera sub resources."""
+        state = self.server.state
+        if action == 'snapshot':
+            return self.reply(b'\xff\xd8' + b'\x00' * 65536 + b'\xff\xd9', ctype='image/jpeg')
+        if action == 'liveview/start':
+            return self.reply({'uri': {'m3u8': 'https://mock/%s.m3u8' % mac, 'rtsp': 'rtsp://mock/%s' % mac}})
+        if action == 'recording/status':
+            started = state.recording.get(mac)
+            return self.reply({'description': 'Recording already started' if started else 'Recording not started'})
+        if action in ('recording/start', 'recording/stop'):
+            state.recording[mac] = action.endswith('start')
+            return self.reply({'description': 'ok'})
+        return self.reply({'message': 'not found'}, 404)
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """Handle POST requests."""
+        state = self.server.state
+        time.sleep(state.latency)
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length)
+        path = urlparse(self.path).path
+        if path == '/identity/api/v1/user/login':
+            return self.reply({'message': 'User logged in successfully.'})
+        if path == '/webhook':
+            with state.lock:
+                state.hooked.extend(json.loads(body.decode('utf-8')))
+            return self.reply({'received': len(body)})
+        if not self.authorized():
+            return self.reply({'message': 'unauthorized'}, 401)
+        if path.startswith('/api/v1/me/basestations/'):
+            try:
+                settings = json.loads(body.decode('utf-8'))['intrusion_settings']
+            except (ValueError, KeyError):
+                settings = {}
+            if state.reject_merged and len(settings.get('modes', [])) + ('active_mode' in settings) > 1:
+                return self.reply({'message': 'bad request'}, 400)
+            if settings.get('active_mode'):
+                state.mode = settings['active_mode']
+            return self.reply({})
+        return self.reply({})
+
+    def do_DELETE(self):  # pylint: disable=invalid-name
+        """Handle DELETE requests."""
+        time.sleep(self.server.state.latency)
+        if not self.authorized():
+            return self.reply({'message': 'unauthorized'}, 401)
+        return self.reply({})
+
+
+class MockServer(ThreadingMixIn, HTTPServer):
+    """Threaded mock API server."""
+
+    daemon_threads = True
+
+    def __init__(self, address=('127.0.0.1', 0), latency=0.0, event_rate=0.0):
+        HTTPServer.__init__(self, address, MockHandler)
+        self.state = MockState(latency, event_rate)
+
+    @property
+    def url(self):
+        """Base URL of server."""
+        return 'http://%s:%d' % self.server_address[:2]
+
+    def start(self):
+        """Serve in background thread."""
+        thread = threading.Thread(target=self.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return self
+
+
+def main():
+    """Run mock server in foreground."""
+    parser = argparse.ArgumentParser(description='Local mock of the Gigaset Elements API')
+    parser.add_argument('--port', type=int, default=8080, help='listen port on 127.0.0.1')
+    parser.add_argument('--latency', type=float, default=0.0, help='added latency per request in seconds')
+    parser.add_argument('--rate', type=float, default=0.0, help='generated events per second')
+    parser.add_argument('--history', type=int, default=1000, help='number of past events (one per minute)')
+    options = parser.parse_args()
+    server = MockServer(('127.0.0.1', options.port), options.latency, options.rate)
+    server.state.add_events(options.history, time.time() - options.history * 60, 60)
+    print('Serving mock API on ' + server.url)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
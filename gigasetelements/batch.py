@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+
+"""gigasetelements.batch: parse command lists run over a single session.
+
+One command per line, blank lines and text after # are ignored::
+
+    plug all off
+    plug Coffee machine on
+    record all start
+    snapshot 7C2F80AABBCC
+    modus away
+
+Device commands take a target (all, id, MAC address or name) followed by
+their value. Consecutive device commands are independent of each other and
+form one group that may run concurrently; modus and siren changes act on
+the whole system and run on their own, in order.
+"""
+
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+
+import collections
+
+
+Command = collections.namedtuple('Command', 'line text action target value')
+
+VERBS = collections.OrderedDict([
+    ('modus', (None, ('home', 'away', 'custom', 'night'))),
+    ('siren', (None, ('arm', 'disarm'))),
+    ('plug', (('sp02', 'sp01'), ('on', 'off'))),
+    ('record', (('yc01',), ('start', 'stop', None))),
+    ('snapshot', (('yc01',), (None,))),
+])
+
+
+class BatchError(ValueError):
+    """Raised on invalid command."""
+
+
+def parse_line(number, text):
+    """Return Command for line or None when line is empty."""
+    tokens = text.split('#', 1)[0].split()
+    if not tokens:
+        return None
+    verb, rest = tokens[0].lower(), tokens[1:]
+    if verb not in VERBS:
+        raise BatchError('line ' + str(number) + ': unknown command ' + tokens[0] + ' (use ' + ', '.join(VERBS) + ')')
+    kinds, values = VERBS[verb]
+    value = rest[-1].lower() if rest and rest[-1].lower() in values else None
+    if value is not None:
+        rest = rest[:-1]
+    if value is None and None not in values:
+        raise BatchError('line ' + str(number) + ': ' + verb + ' requires ' + '|'.join(values))
+    if kinds is None and rest:
+        raise BatchError('line ' + str(number) + ': ' + verb + ' takes no target')
+    if kinds is not None and not rest:
+        raise BatchError('line ' + str(number) + ': ' + verb + ' requires a target (all, id, MAC address or name)')
+    return Command(number, text.strip(), verb, ' '.join(rest) or None, value)
+
+
+def parse(lines):
+    """Return list of commands in lines raising BatchError on the first invalid one."""
+    commands = []
+    for number, text in enumerate(lines, 1):
+        command = parse_line(number, text)
+        if command is not None:
+            commands.append(command)
+    return commands
+
+
+def groups(commands):
+    """Split commands in runs of device commands and single system commands keeping their order."""
+    result = []
+    for command in commands:
+        device = VERBS[command.action][0] is not None
+        if device and result and VERBS[result[-1][-1].action][0] is not None:
+            result[-1].append(command)
+        else:
+            result.append([command])
+    return result
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+
+"""gigasetelements.cache: on-disk cache of slow changing API responses."""
+
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+
+import json
+import threading
+import time
+
+try:
+    from urllib.parse import urlparse
+except ImportError:
+    from urlparse import urlparse
+
+from . import jsonlib
+from .utils import filelock, write_private
+
+
+class ResponseCache(object):
+    """JSON response bodies with their validators keyed on URL and bound to one account."""
+
+    def __init__(self, fileloc, owner):
+        self.fileloc = fileloc
+        self.owner = owner
+        self.lock = threading.Lock()
+        self.entries = {}
+        try:
+            with open(fileloc, 'r') as target:
+                cache = json.load(target)
+            if cache.get('owner') == owner:
+                self.entries = cache.get('entries', {})
+        except (IOError, OSError, ValueError):
+            pass
+
+    def save(self):
+        """Persist cache; caller holds lock."""
+        try:
+            with filelock(self.fileloc):
+                write_private(self.fileloc, json.dumps({'owner': self.owner, 'entries': self.entries}))
+        except (IOError, OSError):
+            pass
+
+    def lookup(self, url, ttl):
+        """Return (data, validators) where data is set when entry is younger than ttl seconds."""
+        with self.lock:
+            entry = self.entries.get(url)
+        if entry is None:
+            return None, {}
+        if time.time() - entry['stored'] < ttl:
+            return jsonlib.loads(entry['body']), {}
+        validators = {}
+        if entry.get('etag'):
+            validators['If-None-Match'] = entry['etag']
+        if entry.get('modified'):
+            validators['If-Modified-Since'] = entry['modified']
+        return None, validators
+
+    def revalidated(self, url):
+        """Renew entry confirmed unchanged by server and return its data."""
+        with self.lock:
+            entry = self.entries[url]
+            entry['stored'] = time.time()
+            self.save()
+        return jsonlib.loads(entry['body'])
+
+    def store(self, url, response):
+        """Keep response body and validators."""
+        with self.lock:
+            self.entries[url] = {'stored': time.time(), 'etag': response.headers.get('ETag'),
+                                 'modified': response.headers.get('Last-Modified'), 'body': response.text}
+            self.save()
+
+    def invalidate(self, url):
+        """Drop all entries of the host url belongs to."""
+        host = urlparse(url).netloc
+        with self.lock:
+            stale = [key for key in self.entries if urlparse(key).netloc == host]
+            for key in stale:
+                del self.entries[key]
+            if stale:
+                self.save()
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+
+"""gigasetelements.diff: report device state changes between refreshes."""
+
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+
+
+WATCHED = {
+    'sensor': (('status', ('status',)), ('firmware', ('firmware_status',)), ('battery', ('battery', 'state')),
+               ('position', ('position_status',))),
+    'camera': (('status', ('status',)), ('firmware', ('firmware_status',)), ('motion', ('motion_detection', 'status')),
+               ('connection', ('settings', 'connection'))),
+    'element': (('status', ('connectionStatus',)), ('firmware', ('firmwareStatus',)), ('battery', ('batteryStatus',)),
+                ('temperature', ('states', 'temperature')), ('humidity', ('states', 'humidity')), ('setpoint', ('states', 'setPoint')),
+                ('pressure', ('states', 'pressure'))),
+}
+
+THRESHOLDS = {'temperature': 0.5, 'humidity': 2.0, 'setpoint': 0.5, 'pressure': 1.0}
+
+
+def device_state(device):
+    """Return watched fields of device as flat dict leaving out missing ones."""
+    state = {}
+    for field, path in WATCHED.get(device.source, ()):
+        value = device.data
+        for key in path:
+            if not isinstance(value, dict) or key not in value:
+                break
+            value = value[key]
+        else:
+            state[field] = value
+    return state
+
+
+class StateDiff(object):
+    """Remember last reported state per device and yield only changes beyond thresholds.
+
+    Numeric fields are compared with the last reported value, not the last seen
+    one, so slow drift is still reported once it adds up to the threshold.
+    """
+
+    def __init__(self, thresholds=None):
+        self.thresholds = dict(THRESHOLDS)
+        self.thresholds.update(thresholds or {})
+        self.states = {}
+        self.names = {}
+        self.primed = False
+
+    def suppressed(self, field, old, new):
+        """Test if numeric change stays within threshold of field."""
+        if isinstance(old, bool) or isinstance(new, bool) or not isinstance(old, (int, float)) or not isinstance(new, (int, float)):
+            return False
+        return abs(new - old) < self.thresholds.get(field, 0)
+
+    def changes(self, devices):
+        """Return list of (name, field, old, new) for devices compared to previous call."""
+        changes = []
+        current = set()
+        for device in devices:
+            key = device.id.lower()
+            current.add(key)
+            self.names[key] = device.name
+            state = device_state(device)
+            previous = self.states.get(key)
+            if previous is None:
+                self.states[key] = state
+                if self.primed:
+                    changes.append((device.name, 'added', None, device.type))
+                continue
+            for field, value in sorted(state.items()):
+                old = previous.get(field)
+                if old == value or self.suppressed(field, old, value):
+                    continue
+                changes.append((device.name, field, old, value))
+                previous[field] = value
+        for key in [key for key in self.states if key not in current]:
+            changes.append((self.names.pop(key), 'removed', None, None))
+            del self.states[key]
+        self.primed = True
+        return changes
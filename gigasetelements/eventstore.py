@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+
+
+"""gigasetelements.eventstore: local indexed copy of the event history."""
+
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+
+import json
+import os
+import sqlite3
+
+from . import jsonlib
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS events (id TEXT PRIMARY KEY, ts INTEGER NOT NULL, type TEXT, grp TEXT, source_type TEXT,
+                                   otype TEXT, sensor_id TEXT, friendly_name TEXT, data TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS events_ts ON events (ts);
+CREATE INDEX IF NOT EXISTS events_grp_ts ON events (grp, ts);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+'''
+
+
+def event_key(item):
+    """Return unique key of event falling back to timestamp and type if no id is present."""
+    return item.get('id') or '%s:%s:%s' % (item['ts'], item.get('type'), item.get('source_id'))
+
+
+class EventStore(object):
+    """SQLite backed event history keyed on event id and indexed on timestamp and group."""
+
+    def __init__(self, fileloc):
+        os.close(os.open(fileloc, os.O_RDWR | os.O_CREAT, 0o600))
+        self.db = sqlite3.connect(fileloc)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        """Close database."""
+        self.db.close()
+
+    def meta(self, key, default=None):
+        """Return stored meta value."""
+        row = self.db.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return default if row is None else json.loads(row[0])
+
+    def set_meta(self, key, value):
+        """Store meta value."""
+        with self.db:
+            self.db.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, json.dumps(value)))
+
+    def reset(self):
+        """Remove all events and meta data."""
+        with self.db:
+            self.db.execute('DELETE FROM events')
+            self.db.execute('DELETE FROM meta')
+
+    def add(self, events):
+        """Insert events ignoring ones already present and return number of new events."""
+        rows = []
+        for item in events:
+            other = item.get('o', {})
+            rows.append((event_key(item), int(item['ts']), item.get('type'), item.get('group'), item.get('source_type'),
+                         other.get('type'), other.get('id', item.get('source_id')), other.get('friendly_name'), jsonlib.dumps(item)))
+        before = self.db.total_changes
+        with self.db:
+            self.db.executemany('INSERT OR IGNORE INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+        return self.db.total_changes - before
+
+    def newest(self):
+        """Return timestamp of most recent stored event."""
+        return self.db.execute('SELECT MAX(ts) FROM events').fetchone()[0]
+
+    def count(self, group=None):
+        """Return number of stored events optionally limited to group."""
+        if group is None:
+            return self.db.execute('SELECT COUNT(*) FROM events').fetchone()[0]
+        return self.db.execute('SELECT COUNT(*) FROM events WHERE grp = ?', (group,)).fetchone()[0]
+
+    def query(self, from_ts=None, to_ts=None, group=None, limit=None):
+        """Yield events newest first optionally filtered on timestamp range and group."""
+        clauses, params = [], []
+        for clause, value in (('ts >= ?', from_ts), ('ts <= ?', to_ts), ('grp = ?', group)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        sql = 'SELECT data FROM events'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += ' ORDER BY ts DESC'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        return (jsonlib.loads(row[0]) for row in self.db.execute(sql, params))
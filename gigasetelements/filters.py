@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+
+
+"""gigasetelements.filters: event filter expressions compiled into predicates.
+
+An expression compares event fields with values and combines comparisons
+with and, or, not and parentheses, for example
+
+    type = open,tilt and otype = ds02,ws02 or group = smoke
+    not name ~ "^garage" and time = 22:00-06:00
+
+= matches any of the comma separated values, != matches none of them and ~ is
+a case insensitive regular expression search. Field time takes a local time
+of day window HH:MM-HH:MM which may wrap around midnight.
+"""
+
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+
+import re
+import time
+
+
+TOKEN = re.compile(r'\s*(?:(\(|\))|(!=|=|~)|"((?:[^"\\]|\\.)*)"|\'([^\']*)\'|([^\s()=!~"\']+))')
+
+WINDOW = re.compile(r'^(\d{1,2}):(\d{2})-(\d{1,2}):(\d{2})$')
+
+FIELDS = {
+    'type': lambda item: item.get('type', ''),
+    'group': lambda item: item.get('group', ''),
+    'otype': lambda item: item.get('o', {}).get('type', ''),
+    'id': lambda item: item.get('o', {}).get('id', item.get('source_id', '')),
+    'name': lambda item: item.get('o', {}).get('friendly_name', ''),
+    'source': lambda item: item.get('source_type', ''),
+}
+
+ALIASES = {'o.type': 'otype', 'device': 'otype', 'sensor': 'id', 'friendly_name': 'name', 'source_type': 'source'}
+
+
+class FilterError(ValueError):
+    """Raised when an expression can not be compiled."""
+
+
+def tokenize(expression):
+    """Split expression into (kind, text) tokens."""
+    tokens, position = [], 0
+    expression = expression.strip()
+    while position < len(expression):
+        match = TOKEN.match(expression, position)
+        if match is None or match.end() == position:
+            raise FilterError('unexpected character at position ' + str(position) + ' in: ' + expression)
+        paren, operator, double, single, word = match.groups()
+        if paren:
+            tokens.append((paren, paren))
+        elif operator:
+            tokens.append(('op', operator))
+        elif double is not None:
+            tokens.append(('value', re.sub(r'\\(.)', r'\1', double)))
+        elif single is not None:
+            tokens.append(('value', single))
+        elif word.lower() in ('and', 'or', 'not'):
+            tokens.append((word.lower(), word))
+        else:
+            tokens.append(('word', word))
+        position = match.end()
+    return tokens
+
+
+def time_window(value):
+    """Return predicate testing whether event falls in local time of day window."""
+    match = WINDOW.match(value)
+    if match is None:
+        raise FilterError('time window must look like HH:MM-HH:MM, got: ' + value)
+    hour, minute, endhour, endminute = [int(group) for group in match.groups()]
+    begin, end = hour * 60 + minute, endhour * 60 + endminute
+    if hour > 23 or endhour > 23 or minute > 59 or endminute > 59:
+        raise FilterError('invalid time of day in: ' + value)
+
+    def minutes(item):
+        stamp = time.localtime(int(item['ts']) / 1000)
+        return stamp.tm_hour * 60 + stamp.tm_min
+
+    if begin <= end:
+        return lambda item: begin <= minutes(item) <= end
+    return lambda item: minutes(item) >= begin or minutes(item) <= end
+
+
+def comparison(field, operator, value):
+    """Return predicate for a single field comparison."""
+    field = ALIASES.get(field.lower(), field.lower())
+    if field == 'time':
+        if operator == '~':
+            raise FilterError('time supports = and != only')
+        window = time_window(value)
+        return window if operator == '=' else lambda item: not window(item)
+    if field not in FIELDS:
+        raise FilterError('unknown field ' + field + ', use one of ' + ', '.join(sorted(list(FIELDS) + ['time'])))
+    getter = FIELDS[field]
+    if operator == '~':
+        try:
+            pattern = re.compile(value, re.IGNORECASE)
+        except re.error as error:
+            raise FilterError('invalid regular expression ' + value + ': ' + str(error))
+        return lambda item: pattern.search(getter(item)) is not None
+    values = frozenset(part.strip().lower() for part in value.split(','))
+    if operator == '=':
+        return lambda item: getter(item).lower() in values
+    return lambda item: getter(item).lower() not in values
+
+
+class Parser(object):
+    """Recursive descent parser turning tokens into nested predicates."""
+
+    def __init__(self, expression):
+        self.expression = expression
+        self.tokens = tokenize(expression)
+        self.position = 0
+
+    def peek(self):
+        """Return kind of next token or None at end."""
+        return self.tokens[self.position][0] if self.position < len(self.tokens) else None
+
+    def take(self, *kinds):
+        """Consume next token which must be of one of the given kinds."""
+        kind = self.peek()
+        if kind not in kinds:
+            found = 'end of expression' if kind is None else repr(self.tokens[self.position][1])
+            raise FilterError('expected ' + ' or '.join(kinds) + ' but found ' + found + ' in: ' + self.expression)
+        self.position += 1
+        return self.tokens[self.position - 1][1]
+
+    def parse(self):
+        """Parse complete expression."""
+        predicate = self.disjunction()
+        if self.peek() is not None:
+            self.take('and', 'or')
+        return predicate
+
+    def disjunction(self):
+        """Parse terms separated by or."""
+        terms = [self.conjunction()]
+        while self.peek() == 'or':
+            self.take('or')
+            terms.append(self.conjunction())
+        if len(terms) == 1:
+            return terms[0]
+        return lambda item: any(term(item) for term in terms)
+
+    def conjunction(self):
+        """Parse factors separated by and."""
+        factors = [self.factor()]
+        while self.peek() == 'and':
+            self.take('and')
+            factors.append(self.factor())
+        if len(factors) == 1:
+            return factors[0]
+        return lambda item: all(factor(item) for factor in factors)
+
+    def factor(self):
+        """Parse negation, parenthesized expression or comparison."""
+        if self.peek() == 'not':
+            self.take('not')
+            inner = self.factor()
+            return lambda item: not inner(item)
+        if self.peek() == '(':
+            self.take('(')
+            inner = self.disjunction()
+            self.take(')')
+            return inner
+        field = self.take('word')
+        operator = self.take('op')
+        value = self.take('word', 'value')
+        return comparison(field, operator, value)
+
+
+def compile_filter(expression):
+    """Compile expression into a predicate taking an event."""
+    predicate = Parser(expression).parse()
+
+    def safe(item):
+        try:
+            return predicate(item)
+        except (KeyError, TypeError, ValueError, AttributeError):
+            return False
+
+    return safe
+
+
+def compile_filters(expressions):
+    """Compile expressions into one predicate matching events matching any of them, None when empty."""
+    predicates = [compile_filter(expression) for expression in expressions or []]
+    if not predicates:
+        return None
+    if len(predicates) == 1:
+        return predicates[0]
+    return lambda item: any(predicate(item) for predicate in predicates)
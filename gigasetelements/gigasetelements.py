@@ -7,34 +7,48 @@
 from __future__ import (absolute_import, division, print_function, unicode_literals)
 
 import os
+import io
 import sys
+import csv
 import time
+import random
 import datetime
 import json
 import logging
+import logging.handlers
+import functools
+import hashlib
+import atexit
+import itertools
+import threading
+import importlib
+import binascii
 
 from builtins import (dict, int, str, open)
-from future.moves.urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+
+from .cache import ResponseCache
+from . import jsonlib
+from .metrics import Metrics
+from .retry import TRANSIENT, CircuitBreaker, RetryPolicy, retry_after, retryable
+from .registry import SENSOR_FRIENDLY, Registry  # noqa: F401 pylint: disable=unused-import
+from .settings import IntrusionSettings
+from .utils import filelock, write_atomic, write_private
+from .workers import QueueWorker
+
+try:
+    from urllib.parse import urlparse
+except ImportError:
+    from urlparse import urlparse
 
 try:
     from colorama import init, Fore
     from requests.packages.urllib3 import disable_warnings
     import requests
-    import configargparse
-    import unidecode
 except ImportError as error:
     sys.exit(str(error) + '. Please install from PyPI: pip install --upgrade ' + str(error).rsplit(None, 1)[-1] + '\n')
 
-if os.name == 'posix':
-    try:
-        from crontab import CronTab
-        from daemonize import Daemonize
-    except ImportError as error:
-        sys.exit(str(error) + '. Please install from PyPI: pip install --upgrade ' + str(error).rsplit(None, 1)[-1])
-
-if any(arg in sys.argv for arg in ['-i', '--ignore']):
-    CONFPATH = []
-elif os.name == 'nt':
+if os.name == 'nt':
     CONFPATH = [os.path.join(os.environ['APPDATA'], os.path.normpath('gigasetelements-cli/gigasetelements-cli.conf'))]
 else:
     CONFPATH = ['/opt/etc/gigasetelements-cli.conf', '/usr/local/etc/gigasetelements-cli.conf', '/usr/etc/gigasetelements-cli.conf',
@@ -46,17 +60,27 @@ _AUTHOR_ = 'dynasticorpheus@gmail.com'
 _VERSION_ = '2023.4.0'
 
 LOGCL = {0: Fore.RESET, 1: Fore.GREEN, 2: Fore.YELLOW, 3: Fore.RED}
+GREEN = frozenset(['ok', 'online', 'closed', 'up_to_date', 'home', 'auto', 'on', 'hd', 'cable', 'normal', 'daemon', 'wifi', 'ended',
+                   'started', 'active', 'green', 'armed', 'pushed', 'verified', 'loaded', 'success', 'download', 'scheduled', 'write'])
+ORANGE = frozenset(['orange', 'warning', 'update'])
 LEVEL = {'intrusion': '4', 'unusual': '3', 'button': '2', 'ok': '1', 'green': '1', 'orange': '3', 'red': '4', 'home': '10',
          'custom': '20', 'away': '30', 'night': '40'}
 
-SENSOR_FRIENDLY = {'ws02': 'window_sensor', 'ps01': 'presence_sensor', 'ps02': 'presence_sensor', 'ds01': 'door_sensor',
-                   'ds02': 'door_sensor', 'is01': 'indoor_siren', 'sp01': 'smart_plug', 'sp02': 'smart_plug', 'bn01': 'button',
-                   'yc01': 'camera', 'sd01': 'smoke', 'um01': 'umos', 'hb01': 'hue_bridge', 'hb01.hl01': 'hue_light',
-                   'bs01': 'base_station', 'wd01': 'water_sensor', 'cl01': 'climate_sensor', 'ts01': 'thermostat'}
-
 AUTH_EXPIRE = 14400
+EVENT_PAGE = 500
+EXPORT_FIELDS = ['id', 'ts', 'time', 'type', 'group', 'device', 'name', 'sensor_id', 'source_type']
+SENSOR_FIELDS = ['name', 'type', 'status', 'firmware', 'battery', 'position', 'quality', 'nightmode', 'mic', 'motion_detection', 'connection', 'ssid',
+                 'temperature', 'setpoint', 'pressure', 'humidity', 'id']
+PLAIN_FIELDS = frozenset(['ssid', 'temperature', 'setpoint', 'pressure', 'humidity'])
 
 JSONFILE = os.path.join(os.path.expanduser('~'), 'gigasetelements-cli.json')
+SESSIONFILE = os.path.join(os.path.expanduser('~'), '.gigasetelements-cli.session')
+CHECKPOINTFILE = os.path.join(os.path.expanduser('~'), '.gigasetelements-cli.checkpoint')
+CACHEFILE = os.path.join(os.path.expanduser('~'), '.gigasetelements-cli.cache')
+EVENTFILE = os.path.join(os.path.expanduser('~'), '.gigasetelements-cli.db')
+SERIESDIR = os.path.join(os.path.expanduser('~'), '.gigasetelements-cli.ts')
+SCHEDULEFILE = os.path.join(os.path.expanduser('~'), '.gigasetelements-cli.schedule')
+TOKENFILE = os.path.join(os.path.expanduser('~'), '.gigasetelements-cli.token')
 
 URL_STATUS = 'https://status.gigaset-elements.de/api/v1/status'
 URL_IDENTITY = 'https://im.gigaset-elements.de/identity/api/v1/user/login'
@@ -71,89 +95,253 @@ URL_CHANNEL = 'https://api.gigaset-elements.de/api/v1/me/notifications/users/cha
 URL_RELEASE = 'https://pypi.python.org/pypi/gigasetelements-cli/json'
 URL_ELEMENTS = 'https://api.gigaset-elements.de/api/v2/me/elements'
 
-parser = configargparse.ArgParser(description='Gigaset Elements - Command-line Interface by dynasticorpheus@gmail.com', default_config_files=CONFPATH)
-parser.add_argument('-c', '--config', help='fully qualified name of configuration-file', required=False, is_config_file=True)
-parser.add_argument('-u', '--username', help='username (email) in use with my.gigaset-elements.com', required=True)
-parser.add_argument('-p', '--password', help='password in use with my.gigaset-elements.com', required=True)
-parser.add_argument('-n', '--notify', help='pushbullet token', required=False, metavar='TOKEN')
-parser.add_argument('-e', '--events', help='show last <number> of events', type=int, required=False)
-parser.add_argument('-d', '--date', help='filter events on begin date - end date', required=False, nargs=2, metavar='DD/MM/YYYY')
-parser.add_argument('-o', '--cronjob', help='schedule cron job at HH:MM (requires --modus or --record)', required=False, metavar='HH:MM')
-parser.add_argument('-x', '--remove', help='remove all cron jobs linked to this program', action='store_true', required=False)
-parser.add_argument('-f', '--filter', help='filter events on type', required=False, choices=(
-    'door', 'window', 'motion', 'siren', 'plug', 'button', 'homecoming', 'intrusion', 'systemhealth', 'camera', 'phone', 'smoke', 'umos'))
-parser.add_argument('-m', '--modus', help='set modus', required=False, choices=('home', 'away', 'custom', 'night'))
-parser.add_argument('-k', '--delay', help='set alarm timer delay in seconds (use 0 to disable)', type=int, required=False)
-parser.add_argument('-D', '--daemon', help='daemonize during monitor mode', action='store_true', required=False)
-parser.add_argument('-z', '--notifications', help='show notification status', action='store_true', required=False)
-parser.add_argument('-X', '--panic', help='trigger alarm', action='store_true', required=False)
-parser.add_argument('-U', '--end', help='end alarm', action='store_true', required=False)
-parser.add_argument('-l', '--log', help='fully qualified name of log file', required=False)
-parser.add_argument('-R', '--rules', help='show custom rules', action='store_true', required=False)
-parser.add_argument('-P', '--pid', help='fully qualified name of pid file', default='/var/run/gigasetelements-cli.pid', required=False)
-parser.add_argument('-s', '--sensor', help='''show sensor status (use -ss to include sensor id's)''', action='count', default=0, required=False)
-parser.add_argument('-b', '--siren', help='arm/disarm siren', required=False, choices=('arm', 'disarm'))
-parser.add_argument('-B', '--sensorid', help='select sensor', type=str, required=False, metavar='sensor id')
-parser.add_argument('-g', '--plug', help='switch plug on/off', required=False, choices=('on', 'off'))
-parser.add_argument('-y', '--privacy', help='switch privacy mode on/off', required=False, choices=('on', 'off'))
-parser.add_argument('-a', '--stream', help='start camera cloud based streams', type=str, required=False, metavar='MAC address')
-parser.add_argument('-r', '--record', help='switch camera recording on/off', type=str, required=False, metavar='MAC address')
-parser.add_argument('-A', '--snapshot', help='download camera snapshot', type=str, required=False, metavar='MAC address')
-parser.add_argument('-t', '--monitor', help='show events using monitor mode', action='store_true', required=False)
-parser.add_argument('-i', '--ignore', help='ignore configuration-file at predefined locations', action='store_true', required=False)
-parser.add_argument('-N', '--noupdate', help='do not periodically check for updates', action='store_true', required=False)
-parser.add_argument('-j', '--restart', help='automatically restart program in case of a connection error', action='store_true', required=False)
-parser.add_argument('-J', '--restartdelay', help='set restart delay in seconds', type=int, required=False, default=60)
-parser.add_argument('-q', '--quiet', help='do not send pushbullet message', action='store_true', required=False)
-parser.add_argument('-I', '--insecure', help='disable SSL/TLS certificate verification', action='store_true', required=False)
-parser.add_argument('-S', '--silent', help='suppress urllib3 warnings', action='store_true', required=False)
-parser.add_argument('-E', '--elements', help='write elements json object to file', nargs='?', const=JSONFILE, type=str, required=False)
-parser.add_argument('-v', '--version', help='show version', action='version', version='%(prog)s version ' + str(_VERSION_))
-
-args = parser.parse_args()
-init(autoreset=True)
-s = requests.Session()
-s.mount('http://', requests.adapters.HTTPAdapter(max_retries=3))
-s.mount('https://', requests.adapters.HTTPAdapter(max_retries=3))
-POST, GET, DELETE = s.post, s.get, s.delete
-
-
-if args.silent:
+USER_AGENT = 'Mozilla/5.0 (Windows NT 6.1) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/41.0.2228.0 Safari/537.36'
+CHUNK = 65536
+READINGS = (('temperature', 'temperature'), ('humidity', 'humidity'), ('pressure', 'pressure'), ('setpoint', 'setPoint'))
+PUSH_INTERVAL = 5
+PUSH_HOLDOFF = 60
+POOL_SIZE = 20
+CONNECT_TIMEOUT = 5
+MAINTENANCE_PAUSE = 300
+
+args = None
+s = None
+LOGGER = logging.getLogger(__name__)
+PIPELINE = None
+LOGLOCK = threading.Lock()
+AUTHLOCK = threading.RLock()
+GENERATION = 0
+NOTIFIER = None
+REGISTRY = Registry()
+STATE = None
+SERVER = None
+SCHEDULER = None
+PUSHERS = {}
+CACHE = None
+METRICS = Metrics()
+RETRY = RetryPolicy()
+BREAKER = CircuitBreaker()
+POST, GET, DELETE = 'post', 'get', 'delete'
+
+
+def require(module, package=None):
+    """Import optional dependency on first use and exit with install hint if missing."""
     try:
+        return importlib.import_module(module)
+    except ImportError as error:
+        sys.exit(str(error) + '. Please install from PyPI: pip install --upgrade ' + (package or module) + '\n')
+
+
+def parse_args(argv=None):
+    """Parse command-line options and configuration file(s)."""
+    from .render import FORMATS
+    configargparse = require('configargparse')
+    argv = sys.argv[1:] if argv is None else argv
+    confpath = [] if any(arg in argv for arg in ['-i', '--ignore']) else CONFPATH
+    thin = any(arg.startswith('--client') for arg in argv)
+    parser = configargparse.ArgParser(description='Gigaset Elements - Command-line Interface by dynasticorpheus@gmail.com', default_config_files=confpath)
+    parser.add_argument('-c', '--config', help='fully qualified name of configuration-file', required=False, is_config_file=True)
+    parser.add_argument('-u', '--username', help='username (email) in use with my.gigaset-elements.com', required=not thin)
+    parser.add_argument('-p', '--password', help='password in use with my.gigaset-elements.com', required=not thin)
+    parser.add_argument('-n', '--notify', help='pushbullet token', required=False, metavar='TOKEN')
+    parser.add_argument('-Y', '--route', help='push monitor events of type (or * for all) to pushbullet token (default --notify)', action='append',
+                        required=False, metavar='TYPE[=TOKEN]')
+    parser.add_argument('-V', '--coalesce', help='combine pushes within given number of seconds', type=float, required=False, default=10)
+    parser.add_argument('-e', '--events', help='show last <number> of events', type=int, required=False)
+    parser.add_argument('-d', '--date', help='filter events on begin date - end date', required=False, nargs=2, metavar='DD/MM/YYYY')
+    parser.add_argument('-o', '--cronjob', help='schedule --modus, --record, --plug or --snapshot at HH:MM (in --serve daemon when used with --serve '
+                        'or --client, otherwise as cron job)', required=False, metavar='HH:MM')
+    parser.add_argument('--repeat', help='repeat job scheduled with --cronjob daily or every given number of seconds', required=False,
+                        metavar='daily|seconds')
+    parser.add_argument('--batch', help='run commands such as "plug all off" or "modus away" (one per line) from file or - for stdin',
+                        required=False, metavar='FILE|-')
+    parser.add_argument('--jobs', help='show jobs scheduled in --serve daemon', action='store_true', required=False)
+    parser.add_argument('-x', '--remove', help='remove all cron jobs (or jobs scheduled in daemon) linked to this program', action='store_true',
+                        required=False)
+    parser.add_argument('-f', '--filter', help='filter events on type', required=False, choices=(
+        'door', 'window', 'motion', 'siren', 'plug', 'button', 'homecoming', 'intrusion', 'systemhealth', 'camera', 'phone', 'smoke', 'umos'))
+    parser.add_argument('-w', '--where', help='filter events on expression e.g. "type = open and otype = ds02" (repeat to match any)', action='append',
+                        required=False, metavar='EXPRESSION')
+    parser.add_argument('-m', '--modus', help='set modus', required=False, choices=('home', 'away', 'custom', 'night'))
+    parser.add_argument('-k', '--delay', help='set alarm timer delay in seconds (use 0 to disable)', type=int, required=False)
+    parser.add_argument('-D', '--daemon', help='daemonize during monitor mode', action='store_true', required=False)
+    parser.add_argument('-z', '--notifications', help='show notification status', action='store_true', required=False)
+    parser.add_argument('-X', '--panic', help='trigger alarm', action='store_true', required=False)
+    parser.add_argument('-U', '--end', help='end alarm', action='store_true', required=False)
+    parser.add_argument('-l', '--log', help='fully qualified name of log file', required=False)
+    parser.add_argument('-L', '--logsize', help='rotate log file at given size in MB (use 0 to disable)', type=int, required=False, default=10)
+    parser.add_argument('-R', '--rules', help='show custom rules', action='store_true', required=False)
+    parser.add_argument('-P', '--pid', help='fully qualified name of pid file', default='/var/run/gigasetelements-cli.pid', required=False)
+    parser.add_argument('--serve', help='serve cached state and actions as JSON on unix socket path or, with bearer token from ' + TOKENFILE +
+                        ', on localhost port', required=False,
+                        metavar='PORT|PATH')
+    parser.add_argument('--client', help='send request to server started with --serve instead of the cloud', required=False, metavar='PORT|PATH')
+    parser.add_argument('--refresh', help='maximum age in seconds of state served by --serve', type=float, required=False, default=10)
+    parser.add_argument('-s', '--sensor', help='''show sensor status (use -ss to include sensor id's)''', action='count', default=0, required=False)
+    parser.add_argument('-b', '--siren', help='arm/disarm siren', required=False, choices=('arm', 'disarm'))
+    parser.add_argument('-B', '--sensorid', help='select sensor', type=str, required=False, metavar='sensor id')
+    parser.add_argument('-g', '--plug', help='switch plug on/off', required=False, choices=('on', 'off'))
+    parser.add_argument('-y', '--privacy', help='switch privacy mode on/off', required=False, choices=('on', 'off'))
+    parser.add_argument('-a', '--stream', help='start camera cloud based streams', type=str, required=False, metavar='MAC address')
+    parser.add_argument('-r', '--record', help='switch camera recording on/off', type=str, required=False, metavar='MAC address')
+    parser.add_argument('-A', '--snapshot', help='download camera snapshot (all or comma separated list)', type=str, required=False,
+                        metavar='MAC address')
+    parser.add_argument('-G', '--timelapse', help='repeat snapshot every given number of seconds', type=float, required=False, metavar='seconds')
+    parser.add_argument('-Q', '--retain', help='keep only given number of most recent snapshots per camera', type=int, required=False, default=0)
+    parser.add_argument('-t', '--monitor', help='show events using monitor mode', action='store_true', required=False)
+    parser.add_argument('--watch', help='report sensor state changes refreshing every given number of seconds', type=float, required=False,
+                        metavar='seconds')
+    parser.add_argument('--threshold', help='minimum change reported by --watch e.g. temperature=0.5', action='append', required=False,
+                        metavar='FIELD=DELTA')
+    parser.add_argument('--recorder', help='record climate readings every given number of seconds', type=float, required=False, metavar='seconds')
+    parser.add_argument('--query', help='show min/max/avg of recorded readings of device (name or id)', required=False, metavar='DEVICE')
+    parser.add_argument('--span', help='number of hours up to now covered by --query', type=float, required=False, default=24)
+    parser.add_argument('--timeseries', help='directory holding recorded readings', default=SERIESDIR, required=False)
+    parser.add_argument('--sink', help='forward monitored events to NDJSON file, http(s) webhook or mqtt://host[:port]/topic, queue options after # '
+                        'e.g. #drop=newest&size=500&batch=50 (repeat for more sinks)', action='append', required=False, metavar='SPEC')
+    parser.add_argument('-M', '--maxinterval', help='maximum monitor polling interval in seconds when idle', type=float, required=False, default=10)
+    parser.add_argument('-T', '--checkpoint', help='fully qualified name of monitor checkpoint file (default per account and filter)', required=False)
+    parser.add_argument('-i', '--ignore', help='ignore configuration-file at predefined locations', action='store_true', required=False)
+    parser.add_argument('-N', '--noupdate', help='do not periodically check for updates', action='store_true', required=False)
+    parser.add_argument('-j', '--restart', help='automatically recover in case of a connection error', action='store_true', required=False)
+    parser.add_argument('-J', '--restartdelay', help='set maximum recovery delay in seconds', type=int, required=False, default=60)
+    parser.add_argument('--retries', help='retry failed requests given number of times with exponential backoff', type=int, required=False,
+                        default=3)
+    parser.add_argument('--timeout', help='read timeout in seconds for all requests instead of per endpoint defaults', type=float, required=False,
+                        metavar='seconds')
+    parser.add_argument('-q', '--quiet', help='do not send pushbullet message', action='store_true', required=False)
+    parser.add_argument('-I', '--insecure', help='disable SSL/TLS certificate verification', action='store_true', required=False)
+    parser.add_argument('-S', '--silent', help='suppress urllib3 warnings', action='store_true', required=False)
+    parser.add_argument('-C', '--nosession', help='do not reuse authenticated session between runs', action='store_true', required=False)
+    parser.add_argument('-F', '--nocache', help='do not serve slow changing API responses from local cache', action='store_true', required=False)
+    parser.add_argument('-W', '--nostore', help='query events directly instead of using local event store', action='store_true', required=False)
+    parser.add_argument('-O', '--export', help='export events to NDJSON or CSV (.csv) file (optionally limited by --date and --filter)', type=str,
+                        required=False, metavar='FILE')
+    parser.add_argument('-Z', '--resume', help='resume interrupted event export', action='store_true', required=False)
+    parser.add_argument('-H', '--stats', help='show request statistics at exit', action='store_true', required=False)
+    parser.add_argument('-K', '--prometheus', help='expose request metrics in Prometheus format on local port or in file', type=str,
+                        required=False, metavar='PORT|FILE')
+    parser.add_argument('--format', help='output format of sensor, notification and event listings (logging goes to stderr unless color)',
+                        choices=FORMATS, default='color', required=False)
+    parser.add_argument('-E', '--elements', help='write elements json object to file', nargs='?', const=JSONFILE, type=str, required=False)
+    parser.add_argument('-v', '--version', help='show version', action='version', version='%(prog)s version ' + str(_VERSION_))
+    return parser.parse_args(argv)
+
+
+def configure(options):
+    """Activate options and create HTTP session used for all API interaction."""
+    global args, s, CACHE, RETRY  # pylint: disable=global-statement
+    args = options
+    if args.client:
+        return args
+    CACHE = None if args.nocache else ResponseCache(CACHEFILE, session_owner())
+    RETRY = RetryPolicy(attempts=args.retries)
+    s = requests.Session()
+    s.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=POOL_SIZE))
+    s.mount('https://', requests.adapters.HTTPAdapter(pool_maxsize=POOL_SIZE))
+    if args.silent:
         disable_warnings()
-    except NameError:
-        pass
+    return args
+
+
+class ConnectionFailure(Exception):
+    """Raised instead of exiting on connection errors when --restart is given."""
+
+
+def backoff_delay(attempt):
+    """Return exponential backoff delay with jitter capped at --restartdelay."""
+    delay = min(args.restartdelay, 2 ** attempt)
+    return random.uniform(delay / 2, delay)
+
+
+class LogPipeline(QueueWorker):
+    """Format and write queued log records off the calling thread."""
+
+    def handle(self, items):
+        write_log(items)
+
+
+def start_pipeline():
+    """Route log output through background pipeline."""
+    global PIPELINE  # pylint: disable=global-statement
+    if PIPELINE is None:
+        PIPELINE = LogPipeline('log', batch=500).start()
+    return
 
 
-def restart_program():
-    """Restarts the current program."""
-    if args.daemon:
-        os.remove(args.pid)
-    python = sys.executable
-    os.execl(python, python, * sys.argv)
+def stop_pipeline():
+    """Flush pending log output and write synchronously again."""
+    global PIPELINE  # pylint: disable=global-statement
+    if PIPELINE is not None:
+        PIPELINE.stop()
+        PIPELINE = None
+    return
+
+
+def write_log(records):
+    """Format log records and write them to screen and log file in one go."""
+    screen, logfile = [], []
+    for stamp, logme, rbg, newline in records:
+        if callable(logme):
+            logme = logme()
+            if logme is None:
+                continue
+        if sys.version_info[0] < 3:
+            logme = unicode(logme)
+        if os.name == 'nt' or args.log is not None:
+            logme = require('unidecode').unidecode(logme)
+        if os.name == 'posix' and args.log is None and sys.version_info[0] <  3 and sys.stdout.encoding is None:
+            logme = require('unidecode').unidecode(logme)
+        if args.log is not None:
+            logfile.append('[' + time.strftime('%c', time.localtime(stamp)) + '] ' + logme)
+        if newline == 2:
+            screen.append('\r\x1b[K')
+        screen.append(LOGCL[rbg] + '[-] ' + logme + ('\n' if newline is None else ' '))
+    if logfile:
+        LOGGER.info('\n'.join(logfile))
+    console().write(''.join(screen))
+    console().flush()
+    return
+
+
+def console():
+    """Return stream for log output which is stderr when stdout carries machine readable output."""
+    return sys.stdout if args.format == 'color' else sys.stderr
+
+
+def log_lines(lines, rbg=0):
+    """Log many lines with a single write."""
+    records = [(time.time(), line, rbg, None) for line in lines if line is not None]
+    if PIPELINE is not None:
+        for record in records:
+            PIPELINE.put(record)
+    else:
+        with LOGLOCK:
+            write_log(records)
+    return
+
+
+def report(items, fields, line, record=None):
+    """Write items as colored log lines or as rows in selected format with a single write."""
+    from .render import render
+    if args.format == 'color':
+        log_lines(line(item) for item in items)
+    else:
+        sys.stdout.write(render((record(item) for item in items) if record else items, fields, args.format))
+        sys.stdout.flush()
     return
 
 
 def log(logme, rbg=0, exitnow=0, newline=None):
     """Print output in selected color and provide program exit on critical error."""
-    if sys.version_info[0] < 3:
-        logme = unicode(logme)
-    if os.name == 'nt' or args.log is not None:
-        logme = unidecode.unidecode(logme)
-    if os.name == 'posix' and args.log is None and sys.version_info[0] <  3 and sys.stdout.encoding is None:
-        logme = unidecode.unidecode(logme)
-    if args.log is not None:
-        logger = logging.getLogger(__name__)
-        logger.info('[' + time.strftime('%c') + '] ' + logme)
-    if newline == 2:
-        print('\r\x1b[K', end='')
-    if newline is not None:
-        newline = ' '
-    print(LOGCL[rbg] + '[-] ' + logme, end=newline)
+    if PIPELINE is not None:
+        PIPELINE.put((time.time(), logme, rbg, newline))
+    else:
+        with LOGLOCK:
+            write_log([(time.time(), logme, rbg, newline)])
     if exitnow == 1:
-        if args.restart:
-            time.sleep(args.restartdelay)
-            restart_program()
+        if threading.current_thread().name == 'MainThread':
+            stop_pipeline()
         sys.exit('\n')
     return
 
@@ -170,51 +358,181 @@ def filewritable(filetype, fileloc, mustexit=1):
     return writable
 
 
+def session_owner():
+    """Return anonymized account identifier used to validate cached session."""
+    return hashlib.sha256(args.username.lower().encode('utf-8')).hexdigest()
+
+
+def load_session():
+    """Restore cookies of a previous still valid session and return its authentication time."""
+    try:
+        with open(SESSIONFILE, 'r') as target:
+            cache = json.load(target)
+    except (IOError, OSError, ValueError):
+        return None
+    if cache.get('owner') != session_owner() or time.time() - cache.get('auth_time', 0) >= AUTH_EXPIRE:
+        return None
+    for cookie in cache.get('cookies', []):
+        s.cookies.set(cookie['name'], cookie['value'], domain=cookie['domain'], path=cookie['path'],
+                      expires=cookie['expires'], secure=cookie['secure'])
+    return cache['auth_time']
+
+
+def save_session(auth_time):
+    """Persist session cookies and authentication time for reuse by subsequent runs."""
+    cookies = [{'name': c.name, 'value': c.value, 'domain': c.domain, 'path': c.path, 'expires': c.expires, 'secure': c.secure} for c in s.cookies]
+    try:
+        write_private(SESSIONFILE, json.dumps({'owner': session_owner(), 'auth_time': auth_time, 'cookies': cookies}))
+    except (IOError, OSError) as error:
+        log('Session'.ljust(17) + ' | ' + color('warning'.ljust(8)) + ' | ' + str(error))
+    return
+
+
 def color(txt):
     """Add color to string based on presence in list and return in uppercase."""
-    green = ['ok', 'online', 'closed', 'up_to_date', 'home', 'auto', 'on', 'hd', 'cable', 'normal', 'daemon', 'wifi', 'ended',
-             'started', 'active', 'green', 'armed', 'pushed', 'verified', 'loaded', 'success', 'download', 'scheduled', 'write']
-    orange = ['orange', 'warning', 'update']
     if args.log is not None:
         txt = txt.upper()
     else:
-        if txt.lower().strip() in green:
+        if txt.lower().strip() in GREEN:
             txt = Fore.GREEN + txt.upper() + Fore.RESET
-        elif txt.lower().strip() in orange:
+        elif txt.lower().strip() in ORANGE:
             txt = Fore.YELLOW + txt.upper() + Fore.RESET
         else:
             txt = Fore.RED + txt.upper() + Fore.RESET
     return txt
 
 
-def rest(method, url, payload=None, header=False, timeout=90, end=1, silent=False):
-    """REST interaction using requests module."""
+def cache_ttl(url):
+    """Return number of seconds a response of url may be served from cache."""
+    if url == URL_RELEASE:
+        return 86400
+    if url == URL_CHANNEL or url.startswith(URL_BASE) and url.endswith('/rules?rules=custom'):
+        return 3600
+    if url in (URL_BASE, URL_CAMERA, URL_ELEMENTS):
+        return 30
+    return 0
+
+
+def request_timeout(url):
+    """Return connect and read timeout of endpoint, read timeout overridden by --timeout."""
+    if args.timeout:
+        return CONNECT_TIMEOUT, args.timeout
+    if url in (URL_STATUS, URL_RELEASE):
+        return CONNECT_TIMEOUT, 10
+    if url.startswith(URL_EVENTS):
+        return CONNECT_TIMEOUT, 30
+    return CONNECT_TIMEOUT, 20
+
+
+def send(method, url, payload, headers, timeout, verify):
+    """Send request retrying transient failures and return response (None on connection error), error and Retry-After seconds."""
+    attempt = 0
+    while 1:
+        request, error, after = None, None, None
+        started = time.time()
+        try:
+            if method == POST:
+                request = getattr(s, method)(url, timeout=timeout, data=payload, headers=headers, allow_redirects=True, verify=verify)
+            else:
+                request = getattr(s, method)(url, timeout=timeout, headers=headers, allow_redirects=True, verify=verify)
+            METRICS.observe(method, url, request.status_code, time.time() - started, len(request.content))
+            after = retry_after(request.headers.get('Retry-After'))
+        except requests.exceptions.RequestException as exc:
+            METRICS.observe(method, url, None, time.time() - started, 0)
+            error = exc
+        delay = RETRY.delay(attempt, after) if retryable(method, None if request is None else request.status_code) else None
+        if delay is None:
+            return request, error, after
+        METRICS.retry(method, url)
+        time.sleep(delay)
+        attempt += 1
+
+
+def circuit_closed():
+    """Test if API requests may be sent, probing the status endpoint once the circuit is due for it."""
+    if BREAKER.closed:
+        return True
+    if not BREAKER.probe():
+        return False
+    status = rest(GET, URL_STATUS, end=0, silent=True)
+    if isinstance(status, dict) and not status.get('isMaintenance'):
+        BREAKER.success()
+        log('Connection'.ljust(17) + ' | ' + color('restored'.ljust(8)) + ' | API available again')
+        return True
+    BREAKER.failure('maintenance' if isinstance(status, dict) else 'status unavailable')
+    log('Connection'.ljust(17) + ' | ' + color('paused'.ljust(8)) + ' | ' + BREAKER.reason + ', next probe in ' + str(int(BREAKER.remaining())) +
+        ' seconds')
+    return False
+
+
+def track(request, error, after):
+    """Feed outcome of API request to circuit breaker."""
+    if request is not None and request.status_code not in TRANSIENT:
+        BREAKER.success()
+        return
+    reason = str(error) if request is None else str(request.status_code) + ' ' + request.reason
+    if BREAKER.failure(reason, after if after is not None and after > RETRY.limit else None):
+        log('Connection'.ljust(17) + ' | ' + color('paused'.ljust(8)) + ' | ' + reason + ', next probe in ' + str(int(BREAKER.remaining())) +
+            ' seconds')
+    return
+
+
+def rest(method, url, payload=None, header=False, timeout=None, end=1, silent=False, relogin=True, fresh=False):
+    """REST interaction using requests module with retries and circuit breaker."""
     request = None
-    data = ''
+    data = None
+    validators = {}
+    ttl = cache_ttl(url) if CACHE is not None and method == GET else 0
+    if ttl:
+        data, validators = CACHE.lookup(url, 0 if fresh else ttl)
+        if data is not None:
+            return data
     if args.insecure:
         pem = False
     else:
         pem = True
     if header:
-        header = {'content-type': 'application/json; charset=UTF-8'}
+        headers = {'content-type': 'application/json; charset=UTF-8'}
     else:
-        header = {'user-agent': 'Mozilla/5.0 (Windows NT 6.1) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/41.0.2228.0 Safari/537.36'}
-    try:
-        if method == POST:
-            request = method(url, timeout=timeout, data=payload, headers=header, allow_redirects=True, verify=pem)
-        else:
-            request = method(url, timeout=timeout, headers=header, allow_redirects=True, verify=pem)
-    except requests.exceptions.RequestException as error:
+        headers = {'user-agent': USER_AGENT}
+    headers.update(validators)
+    guarded = url not in (URL_STATUS, URL_RELEASE)
+    if guarded and not circuit_closed():
+        error = 'API paused (' + BREAKER.reason + '), next probe in ' + str(int(BREAKER.remaining())) + ' seconds'
+    else:
+        generation = GENERATION
+        request, error, after = send(method, url, payload, headers, timeout or request_timeout(url), pem)
+        if guarded:
+            track(request, error, after)
+    if request is None:
         if not silent:
-            log('ERROR'.ljust(17) + ' | ' + 'UNKNOWN'.ljust(8) + ' | ' + str(error), 3, end)
+            log('ERROR'.ljust(17) + ' | ' + 'UNKNOWN'.ljust(8) + ' | ' + str(error), 3, end and not args.restart)
+        if end and args.restart:
+            raise ConnectionFailure(str(error))
+    if request is not None and request.status_code in (401, 403) and relogin and url not in (URL_STATUS, URL_IDENTITY, URL_AUTH):
+        reauthenticate(generation)
+        METRICS.retry(method, url)
+        return rest(method, url, payload, header, timeout, end, silent, False, fresh)
     if request is not None:
+        recoverable = args.restart and request.status_code in TRANSIENT
         if not silent:
             if not request.ok:  # pylint: disable=no-member
                 urlsplit = urlparse(request.url)
-                log('HTTP ERROR'.ljust(17) + ' | ' + str(request.status_code).ljust(8) + ' | ' + request.reason + ' ' + str(urlsplit.path), 3, end)
+                log('HTTP ERROR'.ljust(17) + ' | ' + str(request.status_code).ljust(8) + ' | ' + request.reason + ' ' + str(urlsplit.path), 3,
+                    end and not recoverable)
+        if end and recoverable:
+            raise ConnectionFailure(str(request.status_code))
+        if not request.ok:  # pylint: disable=no-member
+            return None
+        if CACHE is not None and method != GET:
+            CACHE.invalidate(url)
+        if request.status_code == 304 and validators:
+            return CACHE.revalidated(url)
         contenttype = request.headers.get('Content-Type', default='').split(';')[0]
         if contenttype == 'application/json' or request.url == URL_STATUS:
-            data = request.json()
+            data = jsonlib.loads(request.content)
+            if ttl:
+                CACHE.store(url, request)
         elif contenttype == 'image/jpeg':
             data = request.content
         else:
@@ -222,30 +540,111 @@ def rest(method, url, payload=None, header=False, timeout=90, end=1, silent=Fals
     return data
 
 
+def download(url, fileloc, timeout=(CONNECT_TIMEOUT, 60), relogin=True):
+    """Stream response body to file in chunks and return number of bytes written."""
+    started = time.time()
+    partial = fileloc + '.part'
+    size = 0
+    if not circuit_closed():
+        log('Snapshot image'.ljust(17) + ' | ' + color('error'.ljust(8)) + ' | API paused (' + BREAKER.reason + ')')
+        return None
+    generation = GENERATION
+    try:
+        request = s.get(url, timeout=timeout, headers={'user-agent': USER_AGENT}, stream=True, verify=not args.insecure)
+    except requests.exceptions.RequestException as error:
+        METRICS.observe(GET, url, None, time.time() - started, 0)
+        log('ERROR'.ljust(17) + ' | ' + 'UNKNOWN'.ljust(8) + ' | ' + str(error), 3)
+        return None
+    try:
+        if request.status_code in (401, 403) and relogin:
+            METRICS.observe(GET, url, request.status_code, time.time() - started, 0)
+            reauthenticate(generation)
+            METRICS.retry(GET, url)
+            return download(url, fileloc, timeout, False)
+        if not request.ok:  # pylint: disable=no-member
+            METRICS.observe(GET, url, request.status_code, time.time() - started, 0)
+            log('HTTP ERROR'.ljust(17) + ' | ' + str(request.status_code).ljust(8) + ' | ' + request.reason + ' ' + str(urlparse(url).path), 3)
+            return None
+        with open(partial, 'wb') as target:
+            for chunk in request.iter_content(CHUNK):
+                target.write(chunk)
+                size += len(chunk)
+        os.rename(partial, fileloc)
+    except (IOError, OSError, requests.exceptions.RequestException) as error:
+        log('Snapshot image'.ljust(17) + ' | ' + color('error'.ljust(8)) + ' | ' + str(error))
+        if os.path.exists(partial):
+            os.remove(partial)
+        size = None
+    finally:
+        request.close()
+    METRICS.observe(GET, url, request.status_code, time.time() - started, size or 0)
+    return size
+
+
 def authenticate(reauthenticate=False):
-    """Gigaset Elements API authentication."""
-    status_maintenance = rest(GET, URL_STATUS)
+    """Gigaset Elements API authentication reusing cached session when available."""
+    global GENERATION  # pylint: disable=global-statement
+    with AUTHLOCK:
+        if args.nosession:
+            auth_time = login(reauthenticate)
+        else:
+            with filelock(SESSIONFILE):
+                auth_time = None if reauthenticate else load_session()
+                if auth_time is None:
+                    auth_time = login(reauthenticate)
+                    save_session(auth_time)
+                else:
+                    log('Session'.ljust(17) + ' | ' + color('loaded'.ljust(8)) + ' | Valid until ' +
+                        time.strftime('%H:%M', time.localtime(auth_time + AUTH_EXPIRE)))
+        GENERATION += 1
+    return auth_time
+
+
+def reauthenticate(generation):
+    """Re-authenticate after a request sent in session generation was rejected, unless another thread already did."""
+    with AUTHLOCK:
+        if GENERATION == generation:
+            authenticate(reauthenticate=True)
+    return
+
+
+def login(reauthenticate=False):
+    """Gigaset Elements API login."""
+    s.cookies.clear()
+    status_maintenance = rest(GET, URL_STATUS, relogin=False)
     if status_maintenance['isMaintenance']:
-        log('Maintenance'.ljust(17) + ' | ' + 'DETECTED'.ljust(8) + ' | Please try later', 2, 1)
+        log('Maintenance'.ljust(17) + ' | ' + 'DETECTED'.ljust(8) + ' | Please try later', 2, not args.restart)
+        BREAKER.failure('maintenance', MAINTENANCE_PAUSE)
+        raise ConnectionFailure('maintenance')
     auth_time = time.time()
     auth_type = 'Re-authentication'
     payload = {'password': args.password, 'email': args.username}
-    commit_data = rest(POST, URL_IDENTITY, payload)
+    commit_data = rest(POST, URL_IDENTITY, payload, relogin=False)
     if not reauthenticate:
         log('Identity'.ljust(17) + ' | ' + color('verified') + ' | ' + commit_data['message'])
         auth_type = auth_type[3:].title()
-    rest(GET, URL_AUTH)
+    rest(GET, URL_AUTH, relogin=False)
     log(auth_type.ljust(17) + ' | ' + color('success'.ljust(8)) + ' | ')
     return auth_time
 
 
+def fetch_all(urls, fresh=False, end=1):
+    """Retrieve multiple resources concurrently returning results in given order."""
+    with ThreadPoolExecutor(max_workers=len(urls)) as executor:
+        return list(executor.map(lambda url: rest(GET, url, end=end, fresh=fresh), urls))
+
+
 def systemstatus():
-    """Gigaset Elements system status retrieval."""
-    basestation_data = rest(GET, URL_BASE)
+    """Gigaset Elements system status retrieval fetching only what selected options require (None when skipped)."""
+    urls = [URL_BASE, URL_HEALTH]
+    if args.sensor or args.stream or args.record or args.snapshot or args.batch:
+        urls.append(URL_CAMERA)
+    if args.sensor or args.elements or args.watch or args.recorder:
+        urls.append(URL_ELEMENTS)
+    response = dict(zip(urls, fetch_all(urls)))
+    basestation_data, status_data = response[URL_BASE], response[URL_HEALTH]
+    camera_data, elements_data = response.get(URL_CAMERA), response.get(URL_ELEMENTS, {})
     log('Basestation'.ljust(17) + ' | ' + color(basestation_data[0]['status'].ljust(8)) + ' | ' + basestation_data[0]['id'])
-    camera_data = rest(GET, URL_CAMERA)
-    status_data = rest(GET, URL_HEALTH)
-    elements_data = rest(GET, URL_ELEMENTS)
     if status_data['system_health'] == 'green':
         status_data['status_msg_id'] = ''
     else:
@@ -268,28 +667,33 @@ def check_version():
     return
 
 
-def collect_hw(basestation_data, camera_data):
-    """Retrieve sensor list and details."""
-    sensor_id = {}
-    sensor_exist = dict.fromkeys(list(SENSOR_FRIENDLY.values()), False)
-    for item in basestation_data[0]['sensors']:
-        sensor_id.setdefault(item['type'], []).append(item['id'])
-    try:
-        for mac in camera_data:
-            sensor_id.setdefault('yc01', []).append(mac['id'])
-    except IndexError:
-        pass
-    for item in sensor_id:
-        sensor_exist.update(dict.fromkeys([SENSOR_FRIENDLY[item]], True))
-    return sensor_id, sensor_exist
+def collect_hw(basestation_data, camera_data, elements_data):
+    """Merge fetched sensors, cameras and elements into device registry."""
+    REGISTRY.update('sensor', basestation_data[0]['sensors'])
+    if isinstance(camera_data, list):
+        REGISTRY.update('camera', camera_data)
+    if elements_data:
+        REGISTRY.update('element', elements_data.get('bs01', [{}])[0].get('subelements', []))
+    return REGISTRY
+
+
+def write_settings(basestation_data, settings):
+    """Write intrusion settings in one request falling back to one request per setting if rejected."""
+    url = URL_BASE + '/' + basestation_data[0]['id']
+    if rest(POST, url, json.dumps(settings.payload()), end=0, silent=True) is None:
+        log('Settings'.ljust(17) + ' | ' + color('warning'.ljust(8)) + ' | Merged update rejected, writing per setting')
+        for switch in settings.payloads():
+            rest(POST, url, json.dumps(switch))
+    for message in settings.messages:
+        log(message)
+    return
 
 
-def modus_switch(basestation_data, status_data):
+def modus_switch(basestation_data, status_data, settings):
     """Switch alarm modus."""
-    switch = {'intrusion_settings': {'active_mode': args.modus}}
-    rest(POST, URL_BASE + '/' + basestation_data[0]['id'], json.dumps(switch))
-    log('Status'.ljust(17) + ' | ' + color(status_data['system_health'].ljust(8)) + status_data['status_msg_id'].upper() +
-        ' | Modus set from ' + color(basestation_data[0]['intrusion_settings']['active_mode']) + ' to ' + color(args.modus))
+    settings.activate(args.modus)
+    settings.messages.append('Status'.ljust(17) + ' | ' + color(status_data['system_health'].ljust(8)) + status_data['status_msg_id'].upper() +
+                             ' | Modus set from ' + color(basestation_data[0]['intrusion_settings']['active_mode']) + ' to ' + color(args.modus))
     return
 
 
@@ -308,55 +712,52 @@ def end_alarm():
     return
 
 
-def set_delay(basestation_data):
+def set_delay(settings):
     """Set alarm trigger delay."""
-    switch = {"intrusion_settings": {"modes": [{"away": {"trigger_delay": str(args.delay * 1000)}}]}}
-    rest(POST, URL_BASE + '/' + basestation_data[0]['id'], json.dumps(switch))
+    settings.update(['away'], trigger_delay=str(args.delay * 1000))
     if args.delay > 0:
-        log('Alarm timer'.ljust(17) + ' | ' + color(('delayed').ljust(8)) + ' | ' + str(args.delay) + ' seconds')
+        settings.messages.append('Alarm timer'.ljust(17) + ' | ' + color(('delayed').ljust(8)) + ' | ' + str(args.delay) + ' seconds')
     else:
-        log('Alarm timer'.ljust(17) + ' | ' + color(('normal').ljust(8)) + ' | ' + 'No delay')
+        settings.messages.append('Alarm timer'.ljust(17) + ' | ' + color(('normal').ljust(8)) + ' | ' + 'No delay')
     return
 
 
-def set_privacy(basestation_data):
+def set_privacy(settings):
     """Set privacy mode."""
-    moduslist = ['home', 'custom', 'night']
-    for modus in moduslist:
-        switch = {"intrusion_settings": {"modes": [{modus: {"privacy_mode": str(args.privacy in "on").lower()}}]}}
-        rest(POST, URL_BASE + '/' + basestation_data[0]['id'], json.dumps(switch))
-    log('Privacy mode'.ljust(17) + ' | ' + color(args.privacy.ljust(8)) + ' | ')
+    settings.update(['home', 'custom', 'night'], privacy_mode=str(args.privacy in "on").lower())
+    settings.messages.append('Privacy mode'.ljust(17) + ' | ' + color(args.privacy.ljust(8)) + ' | ')
     return
 
 
-def siren(basestation_data, sensor_exist):
+def siren(settings, registry):
     """Dis(arm) siren."""
-    if not sensor_exist['indoor_siren']:
+    if not registry.exists('indoor_siren'):
         log('Siren'.ljust(17) + ' | ' + 'ERROR'.ljust(8) + ' | Not found', 3, 1)
-    moduslist = ['home', 'away', 'custom', 'night']
-    for modus in moduslist:
-        switch = {"intrusion_settings": {"modes": [{modus: {"sirens_on": str(args.siren in "arm").lower()}}]}}
-        rest(POST, URL_BASE + '/' + basestation_data[0]['id'], json.dumps(switch))
-    log('Siren'.ljust(17) + ' | ' + color((args.siren + 'ED').ljust(8)) + ' | ')
+    settings.update(['home', 'away', 'custom', 'night'], sirens_on=str(args.siren in "arm").lower())
+    settings.messages.append('Siren'.ljust(17) + ' | ' + color((args.siren + 'ED').ljust(8)) + ' | ')
     return
 
 
-def plug(basestation_data, sensor_exist, sensor_id):
+def plug(basestation_data, registry):
     """Switch Plug on or off."""
-    if not sensor_exist['smart_plug']:
+    if not registry.exists('smart_plug'):
         log('Plug'.ljust(17) + ' | ' + 'ERROR'.ljust(8) + ' | Not found', 3, 1)
     switch = {"name": args.plug}
     if args.sensorid is not None:
-        plugid = args.sensorid.lower()
-    elif 'sp02' in sensor_id:
-        plugid = sensor_id['sp02'][0]
+        device = registry.get(args.sensorid)
+        plugid = args.sensorid.lower() if device is None else device.id
     else:
-        plugid = sensor_id['sp01'][0]
-    rest(POST, URL_BASE + '/' + basestation_data[0]['id'] + '/endnodes/' + plugid + '/cmd', json.dumps(switch), True)
+        plugid = registry.of_type('sp02', 'sp01')[0].id
+    switch_plug(basestation_data[0]['id'], plugid, switch['name'])
     log('Plug'.ljust(17) + ' | ' + color(args.plug.ljust(8)) + ' | ')
     return
 
 
+def switch_plug(basestation_id, plugid, state, end=1):
+    """Send on/off command to plug and return response or None on failure."""
+    return rest(POST, URL_BASE + '/' + basestation_id + '/endnodes/' + plugid + '/cmd', json.dumps({'name': state}), True, end=end)
+
+
 def istimeformat(timestr):
     """Validate if string has correct time format."""
     try:
@@ -367,17 +768,21 @@ def istimeformat(timestr):
 
 
 def add_cron():
-    """Add job to crontab to set alarm modus or trigger recording."""
+    """Add job to crontab to set alarm modus, trigger recording, switch plug or download snapshot."""
     if os.name == 'nt':
         log('Cronjob'.ljust(17) + ' | ' + 'ERROR'.ljust(8) + ' | Not supported on windows OS', 3, 1)
-    elif args.modus is None and args.record is None:
-        log('Cronjob'.ljust(17) + ' | ' + 'ERROR'.ljust(8) + ' | Requires --modus or --record', 3, 1)
+    elif args.modus is None and args.record is None and args.plug is None and args.snapshot is None:
+        log('Cronjob'.ljust(17) + ' | ' + 'ERROR'.ljust(8) + ' | Requires --modus, --record, --plug or --snapshot', 3, 1)
     if args.modus:
         action = ' --modus ' + args.modus + ' '
-    else:
+    elif args.record:
         action = ' --record ' + args.record + ' '
+    elif args.plug:
+        action = ' --plug ' + args.plug + (' --sensorid ' + args.sensorid if args.sensorid else '') + ' '
+    else:
+        action = ' --snapshot ' + args.snapshot + ' '
     if istimeformat(args.cronjob):
-        cron = CronTab(user=True)
+        cron = require('crontab', 'python-crontab').CronTab(user=True)
         now = datetime.datetime.now()
         timer = now.replace(hour=time.strptime(args.cronjob, '%H:%M')[3], minute=time.strptime(args.cronjob, '%H:%M')[4], second=0, microsecond=0)
         job = cron.new('gigasetelements-cli -u ' + args.username + ' -p ' + args.password +
@@ -402,7 +807,7 @@ def remove_cron():
     """Remove all jobs from crontab setting alarm modus."""
     if os.name == 'nt':
         log('Cronjob'.ljust(17) + ' | ' + 'ERROR'.ljust(8) + ' | Not supported on windows OS', 3, 1)
-    cron = CronTab(user=True)
+    cron = require('crontab', 'python-crontab').CronTab(user=True)
     existing = cron.find_command('gigasetelements-cli')
     count = 0
     for i in existing:
@@ -417,132 +822,529 @@ def remove_cron():
     return
 
 
-def pb_message(pbmsg):
-    """Send message using pushbullet module."""
-    from pushbullet import PushBullet, InvalidKeyError, PushbulletError
+def push_note(token, title, body):
+    """Send message using pushbullet module reusing one client per token."""
+    pushbullet = require('pushbullet', 'pushbullet.py')
     try:
-        pushb = PushBullet(args.notify)
-    except InvalidKeyError:
+        if token not in PUSHERS:
+            PUSHERS[token] = pushbullet.PushBullet(token)
+        PUSHERS[token].push_note(title, body)
+    except pushbullet.InvalidKeyError:
         log('Notification'.ljust(17) + ' | ' + color('token'.ljust(8)) + ' | ')
-    except PushbulletError:
-        log('Notification'.ljust(17) + ' | ' + color('error'.ljust(8)) + ' | ')
+    except pushbullet.PushbulletError as error:
+        log('Notification'.ljust(17) + ' | ' + color('error'.ljust(8)) + ' | ' + str(error))
+        if '429' in str(error) or 'ratelimit' in str(error).lower().replace(' ', ''):
+            return PUSH_HOLDOFF
     else:
-        pushb.push_note('Gigaset Elements', pbmsg)
-        log('Notification'.ljust(17) + ' | ' + color('pushed'.ljust(8)) + ' | ')
+        log('Notification'.ljust(17) + ' | ' + color('pushed'.ljust(8)) + ' | ' + title)
+    return None
+
+
+def start_notifier():
+    """Start background notification queue once."""
+    global NOTIFIER  # pylint: disable=global-statement
+    from .notify import Notifier
+    if NOTIFIER is None:
+        NOTIFIER = Notifier(push_note, 'Gigaset Elements', window=args.coalesce, interval=PUSH_INTERVAL).start()
+        atexit.register(stop_notifier)
+    return NOTIFIER
+
+
+def stop_notifier():
+    """Deliver queued notifications and stop background queue."""
+    global NOTIFIER  # pylint: disable=global-statement
+    if NOTIFIER is not None:
+        NOTIFIER.stop(timeout=60)
+        NOTIFIER = None
     return
 
 
+def pb_message(pbmsg):
+    """Queue message for pushbullet."""
+    start_notifier().notify(args.notify, pbmsg)
+    return
+
+
+def event_routes():
+    """Return list of (event type, token) pairs from route options."""
+    routes = []
+    for route in args.route or []:
+        kind, _, token = route.partition('=')
+        token = token or args.notify
+        if token is None:
+            log('Notification'.ljust(17) + ' | ' + color('error'.ljust(8)) + ' | No token for route ' + kind, 3, 1)
+        routes.append((kind.lower(), token))
+    return routes
+
+
+def route_event(routes, item):
+    """Queue push for every route matching event type, device type or group."""
+    kinds = set(['*', item.get('type', '').lower(), item.get('group', '').lower(), item.get('o', {}).get('type', '').lower()])
+    targets = [token for kind, token in routes if kind in kinds]
+    if targets:
+        message = monitor_line(item)
+        if message is not None:
+            for token in sorted(set(targets)):
+                NOTIFIER.notify(token, message)
+    return
+
+
+def iter_events(from_ts, to_ts, group=None):
+    """Yield events between timestamps newest first paging by sliding to_ts backwards."""
+    from .eventstore import event_key
+    seen = set()
+    while True:
+        url = URL_EVENTS + '?from_ts=' + str(from_ts) + '&to_ts=' + str(to_ts) + '&limit=' + str(EVENT_PAGE)
+        if group is not None:
+            url = url + '&group=' + group
+        page = rest(GET, url)['events']
+        fresh = [item for item in page if event_key(item) not in seen]
+        for item in fresh:
+            yield item
+        if len(page) < EVENT_PAGE or not fresh:
+            return
+        to_ts = int(page[-1]['ts'])
+        seen = set(event_key(item) for item in page if int(item['ts']) == to_ts)
+
+
+def sync_events(store, from_ts=None, count=None, group=None):
+    """Update local event store incrementally and extend it backwards to cover from_ts or count events."""
+    now = int(time.time()) * 1000
+    if store.meta('owner') != session_owner():
+        store.reset()
+        store.set_meta('owner', session_owner())
+    covered = store.meta('covered_from')
+    if covered is None:
+        covered = now
+    else:
+        store.add(iter_events(store.newest() or covered, now))
+    if from_ts is not None and from_ts < covered and not store.meta('complete'):
+        store.add(iter_events(from_ts, covered))
+        covered = from_ts
+    elif count is not None and not store.meta('complete') and store.count(group) < count:
+        batch = []
+        for item in iter_events(0, covered):
+            batch.append(item)
+            if len(batch) == EVENT_PAGE:
+                store.add(batch)
+                covered = int(batch[-1]['ts']) + 1
+                batch = []
+                if store.count(group) >= count:
+                    break
+        else:
+            store.add(batch)
+            covered = 0
+            store.set_meta('complete', True)
+    store.set_meta('covered_from', covered)
+    return
+
+
+def event_line(item):
+    """Format past event for display."""
+    try:
+        if 'type' in item['o']:
+            return time.strftime('%m/%d/%y %H:%M:%S', time.localtime(int(item['ts']) / 1000)) + ' | ' + item['o'][
+                'type'].ljust(8) + ' | ' + item['type'] + ' ' + item['o'].get('friendly_name', item['o']['type'])
+    except KeyError:
+        return time.strftime('%m/%d/%y %H:%M:%S', time.localtime(int(item['ts']) / 1000)) + ' | ' + item['type'].ljust(8) + ' | ' + item['source_type']
+    return None
+
+
+def date_range():
+    """Return --date filter as pair of millisecond timestamps."""
+    from_ts = to_ts = None
+    if args.date is not None:
+        try:
+            from_ts = int(time.mktime(time.strptime(args.date[0], '%d/%m/%Y'))) * 1000
+            to_ts = int(time.mktime(time.strptime(args.date[1], '%d/%m/%Y'))) * 1000
+        except ValueError:
+            log('Event(s)'.ljust(17) + ' | ' + 'ERROR'.ljust(8) + ' | ' + 'Date(s) filter not in DD/MM/YYYY format', 3, 1)
+    return from_ts, to_ts
+
+
+def event_filter():
+    """Return compiled predicate of --where expressions or None."""
+    from .filters import FilterError, compile_filters
+    try:
+        return compile_filters(args.where)
+    except FilterError as error:
+        log('Filter'.ljust(17) + ' | ' + color('error'.ljust(8)) + ' | ' + str(error), 3, 1)
+    return None
+
+
 def list_events():
     """List past events optionally filtered by date and/or type."""
+    from .eventstore import EventStore
+    from_ts, to_ts = date_range()
+    where = event_filter()
     if args.filter is None and args.date is None:
         log('Event(s)'.ljust(17) + ' | ' + str(args.events).ljust(8) + ' | ' + 'No filter')
-        event_data = rest(GET, URL_EVENTS + '?limit=' + str(args.events))
     if args.filter is not None and args.date is None:
         log('Event(s)'.ljust(17) + ' | ' + str(args.events).ljust(8) + ' | ' + args.filter.title())
-        event_data = rest(GET, URL_EVENTS + '?limit=' + str(args.events) + '&group=' + str(args.filter))
-    if args.date is not None:
-        try:
-            from_ts = str(int(time.mktime(time.strptime(args.date[0], '%d/%m/%Y'))) * 1000)
-            to_ts = str(int(time.mktime(time.strptime(args.date[1], '%d/%m/%Y'))) * 1000)
-        except ValueError:
-            log('Event(s)'.ljust(17) + ' | ' + 'ERROR'.ljust(8) + ' | ' + 'Date(s) filter not in DD/MM/YYYY format', 3, 1)
     if args.filter is None and args.date is not None:
         log('Event(s)'.ljust(17) + ' | ' + 'DATE'.ljust(8) + ' | ' + args.date[0] + ' - ' + args.date[1])
-        event_data = rest(GET, URL_EVENTS + '?from_ts=' + from_ts + '&to_ts=' + to_ts + '&limit=999')
     if args.filter is not None and args.date is not None:
         log('Event(s)'.ljust(17) + ' | ' + '*'.ljust(8) + ' | ' + args.filter.title() + ' | ' + args.date[0] + ' - ' + args.date[1])
-        event_data = rest(GET, URL_EVENTS + '?from_ts=' + from_ts + '&to_ts=' + to_ts + '&group=' + str(args.filter) + '&limit=999')
-    for item in event_data['events']:
+    if where is not None:
+        log('Event(s)'.ljust(17) + ' | ' + 'WHERE'.ljust(8) + ' | ' + ' or '.join(args.where))
+    limit = args.events if args.date is None else None
+    store = None
+    if args.nostore and args.date is None and where is None:
+        group = '' if args.filter is None else '&group=' + args.filter
+        event_data = rest(GET, URL_EVENTS + '?limit=' + str(args.events) + group)['events']
+    elif args.nostore:
+        event_data = iter_events(from_ts or 0, to_ts or int(time.time() * 1000), args.filter)
+    else:
+        store = EventStore(EVENTFILE)
+        if args.date is None:
+            sync_events(store, count=args.events, group=args.filter)
+        else:
+            sync_events(store, from_ts=from_ts)
+        event_data = store.query(from_ts, to_ts, args.filter, limit if where is None else None)
+    if where is not None:
+        event_data = itertools.islice((item for item in event_data if where(item)), limit)
+    report(event_data, EXPORT_FIELDS, event_line, event_record)
+    if store is not None:
+        store.close()
+    return
+
+
+def event_record(item):
+    """Flatten event into record holding the fields shown by event listings."""
+    from .eventstore import event_key
+    other = item.get('o', {})
+    return {'id': event_key(item), 'ts': int(item['ts']), 'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(int(item['ts']) / 1000)),
+            'type': item['type'], 'group': item.get('group', ''), 'device': other.get('type', 'system'),
+            'name': other.get('friendly_name', other.get('type', item.get('source_type', ''))), 'sensor_id': other.get('id', item.get('source_id', '')),
+            'source_type': item.get('source_type', '')}
+
+
+def last_exported(fileloc, csvmode):
+    """Return timestamp and keys of oldest events at the tail of an export file, cutting off an incomplete last line."""
+    try:
+        with open(fileloc, 'r+b') as target:
+            target.seek(0, os.SEEK_END)
+            offset = max(0, target.tell() - 65536)
+            target.seek(offset)
+            tail = target.read()
+            if tail and not tail.endswith(b'\n') and (b'\n' in tail or not offset):
+                tail = tail[:tail.rfind(b'\n') + 1]
+                target.truncate(offset + len(tail))
+                log('Event export'.ljust(17) + ' | ' + color('warning'.ljust(8)) + ' | Dropped incomplete last line of ' + fileloc)
+    except (IOError, OSError):
+        return None, set()
+    lines = tail.decode('utf-8', 'replace').splitlines()
+    if offset:
+        lines = lines[1:]
+    if csvmode:
+        rows = (dict(zip(EXPORT_FIELDS, row)) for row in csv.reader(lines) if row and row[0] != EXPORT_FIELDS[0])
+    else:
+        rows = (line for line in lines if line.strip())
+    records = []
+    for row in rows:
         try:
-            if 'type' in item['o']:
-                log(time.strftime('%m/%d/%y %H:%M:%S', time.localtime(int(item['ts']) / 1000)) + ' | ' + item['o']
-                    ['type'].ljust(8) + ' | ' + item['type'] + ' ' + item['o'].get('friendly_name', item['o']['type']))
-        except KeyError:
-            log(time.strftime('%m/%d/%y %H:%M:%S', time.localtime(int(item['ts']) / 1000)) + ' | ' + item['type'].ljust(8) + ' | ' + item['source_type'])
+            record = row if csvmode else jsonlib.loads(row)
+            records.append((int(record['ts']), record['id']))
+        except (ValueError, KeyError, TypeError):
             continue
+    if not records:
+        return None, set()
+    last_ts = records[-1][0]
+    return last_ts, set(key for ts, key in records if ts == last_ts)
+
+
+def export_events():
+    """Stream events newest first to NDJSON or CSV file page by page."""
+    from .eventstore import event_key
+    from_ts, to_ts = date_range()
+    from_ts = from_ts or 0
+    to_ts = to_ts or int(time.time()) * 1000
+    csvmode = args.export.lower().endswith('.csv')
+    skip = set()
+    if args.resume:
+        last_ts, skip = last_exported(args.export, csvmode)
+        to_ts = last_ts if last_ts is not None else to_ts
+    append = args.resume and os.path.isfile(args.export) and os.path.getsize(args.export) > 0
+    log('Event export'.ljust(17) + ' | ' + color(('resume' if append else 'write').ljust(8)) + ' | ' + args.export)
+    count = 0
+    try:
+        with open(args.export, 'a' if append else 'w', newline='' if csvmode else None, encoding='utf-8') as target:
+            writer = csv.DictWriter(target, EXPORT_FIELDS) if csvmode else None
+            if csvmode and not append:
+                writer.writeheader()
+            where = event_filter() or (lambda item: True)
+            records = (event_record(item) for item in iter_events(from_ts, to_ts, args.filter) if event_key(item) not in skip and where(item))
+            for record in records:
+                if csvmode:
+                    writer.writerow(record)
+                else:
+                    target.write(jsonlib.dumps(record) + '\n')
+                count += 1
+    except IOError as error:
+        log('Event export'.ljust(17) + ' | ' + color('error'.ljust(8)) + ' | ' + str(error), 3, 1)
+    log('Event export'.ljust(17) + ' | ' + color('success'.ljust(8)) + ' | ' + str(count) + ' event(s)')
     return
 
 
+def monitor_line(item):
+    """Format realtime event for display."""
+    try:
+        if 'type' in item['o']:
+            return time.strftime('%m/%d/%y %H:%M:%S', time.localtime(int(item['ts']) / 1000)) + ' | ' + item['o'][
+                'type'].ljust(8) + ' | ' + item['type'] + ' ' + item['o'].get('friendly_name', item['o']['type'])
+        return time.strftime('%m/%d/%y %H:%M:%S', time.localtime(int(item['ts']) / 1000)) + ' | ' + 'system'.ljust(8) + ' | ' + \
+            item['source_type'] + ' ' + item['type']
+    except KeyError:
+        return None
+
+
+def sink_warning(sink, message):
+    """Report failed delivery of sink."""
+    from .sinks import redact
+    log('Event sink'.ljust(17) + ' | ' + color('error'.ljust(8)) + ' | ' + sink.kind + ' ' + redact(sink.target) + ' | ' + message)
+    return
+
+
+def start_sinks():
+    """Create and start event sinks given with --sink."""
+    from .sinks import FileSink, MqttSink, WebhookSink, parse_spec, redact
+    sinks = []
+    for spec in args.sink or []:
+        try:
+            kind, target, options = parse_spec(spec)
+            if kind == 'mqtt':
+                sink = MqttSink(target, require('paho.mqtt.client', 'paho-mqtt'), warn=sink_warning, **options)
+            else:
+                sink = (FileSink if kind == 'file' else WebhookSink)(target, warn=sink_warning, **options)
+        except (ValueError, IOError, OSError) as error:
+            log('Event sink'.ljust(17) + ' | ' + color('error'.ljust(8)) + ' | ' + redact(spec) + ' | ' + str(error), 3, 1)
+        sinks.append(sink.start())
+        log('Event sink'.ljust(17) + ' | ' + color('started'.ljust(8)) + ' | ' + kind + ' ' + redact(target))
+    return sinks
+
+
+def stop_sinks(sinks):
+    """Deliver queued events and stop sinks."""
+    from .sinks import redact
+    for sink in sinks:
+        sink.stop()
+        log('Event sink'.ljust(17) + ' | ' + color(('warning' if sink.dropped else 'ok').ljust(8)) + ' | ' + sink.kind + ' ' + redact(sink.target) +
+            ' | ' + str(sink.delivered) + ' delivered, ' + str(sink.dropped) + ' dropped')
+    return
+
+
+def checkpoint_file():
+    """Return default monitor checkpoint file keyed on account, --filter and --where."""
+    key = '|'.join([session_owner(), args.filter or ''] + (args.where or []))
+    return CHECKPOINTFILE + '.' + hashlib.sha256(key.encode('utf-8')).hexdigest()[:12]
+
+
 def monitor(auth_time, basestation_data, status_data):
     """List events realtime optionally filtered by type."""
-    url_monitor = URL_EVENTS + '?limit=10'
-    if args.filter is not None:
-        url_monitor = url_monitor + '&group=' + args.filter
+    from .poller import EventPoller
+    poller = EventPoller(lambda from_ts, to_ts: iter_events(from_ts, to_ts, args.filter), args.checkpoint or checkpoint_file(),
+                         max_interval=args.maxinterval)
+    routes = [] if args.quiet else event_routes()
+    where = event_filter()
     log('Monitor mode'.ljust(17) + ' | ' + color('started'.ljust(8)) + ' | ' + 'CTRL+C to exit')
-    from_ts = str(int(time.time()) * 1000)
+    start_pipeline()
+    if routes:
+        start_notifier()
+    sinks = start_sinks()
+    attempt = 0
     try:
         while 1:
-            lastevents = rest(GET, url_monitor + '&from_ts=' + from_ts)
-            for item in reversed(lastevents['events']):
-                try:
-                    if 'type' in item['o']:
-                        log(time.strftime('%m/%d/%y %H:%M:%S', time.localtime(int(item['ts']) / 1000)) + ' | ' + item['o'][
-                            'type'].ljust(8) + ' | ' + item['type'] + ' ' + item['o'].get('friendly_name', item['o']['type']), 0, 0, 2)
-                    else:
-                        log(time.strftime('%m/%d/%y %H:%M:%S', time.localtime(int(item['ts']) / 1000)) +
-                            ' | ' + 'system'.ljust(8) + ' | ' + item['source_type'] + ' ' + item['type'], 0, 0, 2)
-                    from_ts = str(int(item['ts']) + 1)
-                except KeyError:
-                    continue
+            try:
+                lastevents = poller.poll()
+                attempt = 0
+                if where is not None:
+                    lastevents = [item for item in lastevents if where(item)]
+            except ConnectionFailure:
+                attempt = recover(attempt)
+                continue
+            if args.prometheus and not args.prometheus.isdigit():
+                export_metrics()
+            for item in lastevents:
+                log(functools.partial(monitor_line, item), 0, 0, 2)
+                if routes:
+                    route_event(routes, item)
+                if sinks:
+                    record = event_record(item)
+                    for sink in sinks:
+                        sink.put(record)
             if time.time() - auth_time >= AUTH_EXPIRE:
-                auth_time = authenticate(reauthenticate=True)
+                try:
+                    auth_time = authenticate(reauthenticate=True)
+                except ConnectionFailure:
+                    attempt = recover(attempt)
             else:
-                time.sleep(1)
+                poller.wait()
     except KeyboardInterrupt:
         log('Program'.ljust(17) + ' | ' + color('halted'.ljust(8)) + ' | ' + 'CTRL+C', 0, 1, 2)
+    finally:
+        stop_sinks(sinks)
+        stop_notifier()
+        stop_pipeline()
     return
 
 
-def sensor(basestation_data, sensor_exist, camera_data, elements_data):
-    """Show sensor details and current state."""
-    log(basestation_data[0]['friendly_name'].ljust(17) + ' | ' + color(basestation_data[0]
-                                                                       ['status'].ljust(8)) + ' | firmware ' + color(basestation_data[0]['firmware_status']))
-    for item in basestation_data[0]['sensors']:
-        try:
-            if item['type'] not in ['cl01', 'ts01']:
-                log(item['friendly_name'].ljust(17) + ' | ' + color(item['status'].ljust(8)) + ' | firmware ' + color(item['firmware_status']), 0, 0, 0)
-                if item['type'] not in ['is01', 'sp01', 'sp02']:
-                    print('| battery ' + color(item['battery']['state']), end=' ')
-                if item['type'] in ['ds02', 'ds01', 'ws02']:
-                    print('| position ' + color(item['position_status']), end=' ')
-                if args.sensor > 1:
-                    print('| ' + item['id'].upper(), end=' ')
-                print()
-        except KeyError:
-            print()
-    if sensor_exist['camera']:
-        try:
-            for cam in camera_data:
-                print('[-] ' + cam['friendly_name'].ljust(17) + ' | ' + color(cam['status'].ljust(8)) + ' | firmware ' + color(cam['firmware_status']), end=' ')
-                print(('| quality ' + color(cam['settings']['quality']) + ' | nightmode ' + color(cam['settings']['nightmode']) + ' | mic ' +
-                       color(cam['settings']['mic'])), end=' ')
-                print(('| motion detection ' + color(cam['motion_detection']['status']) + ' | connection ' + color(cam['settings']['connection'])), end=' ')
-                if cam['settings']['connection'] == 'wifi':
-                    print('| ssid ' + Fore.GREEN + str(cam['wifi_ssid']).upper(), end=' ')
-                if args.sensor > 1:
-                    print('| ' + cam['id'].upper(), end=' ')
-                print()
-        except KeyError:
-            print()
-    if sensor_exist['thermostat'] or sensor_exist['climate_sensor'] or sensor_exist['umos'] or sensor_exist['water_sensor']:
+def watch_thresholds():
+    """Return --threshold options as dict of field and minimum change."""
+    thresholds = {}
+    for item in args.threshold or []:
+        field, _, delta = item.partition('=')
         try:
-            for clm in elements_data["bs01"][0]["subelements"]:
-                if clm['type'] in ['bs01.ts01', 'bs01.cl01', 'bs01.um01','bs01.wd01']:
-                    print('[-] ' + clm['friendlyName'].ljust(17) + ' | ' + color(clm['connectionStatus'].ljust(8)) + ' | firmware ' + color(clm['firmwareStatus']) +
-                        ' | battery ' + color(clm['batteryStatus']) + ' | temperature ' +str(round(clm['states']['temperature'], 1)) , end=' ')
-                    if clm['type'] == 'bs01.ts01':
-                        print('| setpoint ' +str(int(clm['states']['setPoint'])) , end=' ')
-                    elif clm['type'] == 'bs01.um01':
-                        print('| pressure ' +str(int(clm['states']['pressure'])) , end=' ')
-                    elif clm['type'] in ['bs01.cl01','bs01.wd01']:
-                        print('| humidity ' +str(round(clm['states']['humidity'], 1)) , end=' ')
+            thresholds[field.strip().lower()] = float(delta)
+        except ValueError:
+            log('Threshold'.ljust(17) + ' | ' + color('error'.ljust(8)) + ' | Expected FIELD=DELTA, got ' + item, 3, 1)
+    return thresholds
+
+
+def watch(auth_time, registry):
+    """Refresh basestation and elements state periodically reporting only what changed."""
+    from .diff import StateDiff
+    differ = StateDiff(watch_thresholds())
+    differ.changes(registry)
+    log('Watch mode'.ljust(17) + ' | ' + color('started'.ljust(8)) + ' | Every ' + str(args.watch) + 's, CTRL+C to exit')
+    attempt = 0
+    try:
+        while 1:
+            time.sleep(args.watch)
+            try:
+                basestation_data, elements_data = fetch_all([URL_BASE, URL_ELEMENTS], fresh=True)
+                attempt = 0
+            except ConnectionFailure:
+                attempt = recover(attempt)
+                continue
+            if basestation_data:
+                collect_hw(basestation_data, None, elements_data)
+                for name, field, old, new in differ.changes(registry):
+                    old, new = [round(value, 1) if isinstance(value, float) else value for value in (old, new)]
+                    if field in ('added', 'removed'):
+                        log(name.ljust(17) + ' | ' + color(field.ljust(8)) + ' | ' + (new or ''))
                     else:
-                        pass
-                    if args.sensor > 1:
-                        print('| ' + clm['id'].rsplit(".", 1)[1].upper(), end=' ')
-                    print()
-        except KeyError:
-            print()
+                        log(name.ljust(17) + ' | ' + color(str(new).ljust(8)) + ' | ' + field + ' was ' + str(old))
+            if time.time() - auth_time >= AUTH_EXPIRE:
+                try:
+                    auth_time = authenticate(reauthenticate=True)
+                except ConnectionFailure:
+                    attempt = recover(attempt)
+    except KeyboardInterrupt:
+        log('Program'.ljust(17) + ' | ' + color('halted'.ljust(8)) + ' | ' + 'CTRL+C', 0, 1)
+    return
+
+
+def sample(series, registry):
+    """Append current climate readings of all elements to time series and return number of samples."""
+    stamp = time.time()
+    count = 0
+    for device in registry.of_source('element'):
+        states = device.data.get('states', {})
+        for metric, field in READINGS:
+            if isinstance(states.get(field), (int, float)):
+                count += series.record(device.id, device.name, metric, stamp, states[field])
+    return count
+
+
+def recorder(auth_time, registry):
+    """Sample climate, thermostat and umos readings into compact time series."""
+    from .timeseries import TimeSeries
+    series = TimeSeries(args.timeseries)
+    log('Recorder'.ljust(17) + ' | ' + color('started'.ljust(8)) + ' | Every ' + str(args.recorder) + 's to ' + args.timeseries + ', CTRL+C to exit')
+    attempt = 0
+    try:
+        while 1:
+            log('Recorder'.ljust(17) + ' | ' + color('write'.ljust(8)) + ' | ' + str(sample(series, registry)) + ' samples at ' +
+                time.strftime('%H:%M:%S'), 0, 0, 2)
+            time.sleep(args.recorder)
+            try:
+                basestation_data, elements_data = fetch_all([URL_BASE, URL_ELEMENTS], fresh=True)
+                attempt = 0
+            except ConnectionFailure:
+                attempt = recover(attempt)
+                continue
+            if basestation_data:
+                collect_hw(basestation_data, None, elements_data)
+            if time.time() - auth_time >= AUTH_EXPIRE:
+                try:
+                    auth_time = authenticate(reauthenticate=True)
+                except ConnectionFailure:
+                    attempt = recover(attempt)
+    except KeyboardInterrupt:
+        log('Program'.ljust(17) + ' | ' + color('halted'.ljust(8)) + ' | ' + 'CTRL+C', 0, 1, 2)
+    return
+
+
+def query_readings():
+    """Show statistics of recorded readings of device over --span hours."""
+    from .timeseries import TimeSeries
+    series = TimeSeries(args.timeseries)
+    devices = series.lookup(args.query)
+    if not devices:
+        log('Readings'.ljust(17) + ' | ' + 'ERROR'.ljust(8) + ' | No recorded device ' + args.query, 3, 1)
+    to_ts = time.time()
+    from_ts = to_ts - args.span * 3600
+    for device in devices:
+        for metric in series.metrics(device):
+            result = series.query(device, metric, from_ts, to_ts)
+            if result is None:
+                log(series.names[device].ljust(17) + ' | ' + metric.upper().ljust(8) + ' | No readings in last ' + str(args.span) + ' hours')
+                continue
+            log(series.names[device].ljust(17) + ' | ' + metric.upper().ljust(8) + ' | min ' + str(result['min']) + ' | max ' + str(result['max']) +
+                ' | avg ' + str(result['avg']) + ' | ' + str(result['count']) + ' samples (' + result['tier'] + ')')
+    return
+
+
+def sensor_rows(basestation_data, registry):
+    """Return basestation, sensor, camera and climate device details as rows."""
+    station = basestation_data[0]
+    rows = [{'name': station['friendly_name'], 'type': 'basestation', 'status': station['status'], 'firmware': station['firmware_status'],
+             'id': station['id'].upper()}]
+    for device in registry.of_source('sensor'):
+        item = device.data
+        if item['type'] in ['cl01', 'ts01'] or 'status' not in item:
+            continue
+        row = {'name': item['friendly_name'], 'type': item['type'], 'status': item['status'], 'firmware': item.get('firmware_status'),
+               'id': item['id'].upper()}
+        if item['type'] not in ['is01', 'sp01', 'sp02']:
+            row['battery'] = item.get('battery', {}).get('state')
+        if item['type'] in ['ds02', 'ds01', 'ws02']:
+            row['position'] = item.get('position_status')
+        rows.append(row)
+    for cam in (device.data for device in registry.of_type('yc01')):
+        settings = cam.get('settings', {})
+        rows.append({'name': cam['friendly_name'], 'type': 'yc01', 'status': cam['status'], 'firmware': cam.get('firmware_status'),
+                     'quality': settings.get('quality'), 'nightmode': settings.get('nightmode'), 'mic': settings.get('mic'),
+                     'motion_detection': cam.get('motion_detection', {}).get('status'), 'connection': settings.get('connection'),
+                     'ssid': str(cam.get('wifi_ssid')).upper() if settings.get('connection') == 'wifi' else None, 'id': cam['id'].upper()})
+    for clm in (device.data for device in registry.of_source('element')):
+        if clm['type'] in ['bs01.ts01', 'bs01.cl01', 'bs01.um01', 'bs01.wd01']:
+            states = clm.get('states', {})
+            row = {'name': clm.get('friendlyName', ''), 'type': clm['type'].split('.', 1)[1], 'status': clm.get('connectionStatus', ''),
+                   'firmware': clm.get('firmwareStatus'), 'battery': clm.get('batteryStatus'), 'id': clm['id'].rsplit('.', 1)[1].upper()}
+            if 'temperature' in states:
+                row['temperature'] = round(states['temperature'], 1)
+            if clm['type'] == 'bs01.ts01' and 'setPoint' in states:
+                row['setpoint'] = int(states['setPoint'])
+            elif clm['type'] == 'bs01.um01' and 'pressure' in states:
+                row['pressure'] = int(states['pressure'])
+            elif clm['type'] in ['bs01.cl01', 'bs01.wd01'] and 'humidity' in states:
+                row['humidity'] = round(states['humidity'], 1)
+            rows.append(row)
+    return rows
+
+
+def sensor_line(row):
+    """Format device row for display."""
+    details = [field.replace('_', ' ') + ' ' + (str(row[field]) if field in PLAIN_FIELDS else color(row[field]))
+               for field in SENSOR_FIELDS[3:-1] if row.get(field) is not None]
+    return row['name'].ljust(17) + ' | ' + color(row['status'].ljust(8)) + ''.join(' | ' + detail for detail in details) + \
+        (' | ' + row['id'] if args.sensor > 1 else '')
+
+
+def sensor(basestation_data, registry):
+    """Show sensor details and current state."""
+    report(sensor_rows(basestation_data, registry), SENSOR_FIELDS, sensor_line)
     return
 
 
@@ -561,75 +1363,127 @@ def rules(basestation_data):
     return
 
 
+def notification_line(row):
+    """Format notification channel for display."""
+    return row['name'].ljust(17) + ' | ' + color(row['status'].ljust(8)) + ' | ' + ' '.join(row['groups'])
+
+
 def notifications():
     """List notification settings per mobile device."""
     channels = rest(GET, URL_CHANNEL)
-    for item in channels.get('gcm', ''):
-        try:
-            print(('[-] ' + item['friendlyName'].ljust(17) + ' | ' + color(item['status'].ljust(8)) + ' |'), end=' ')
-            for item2 in item['notificationGroups']:
-                print(item2, end=' ')
-            print()
-        except KeyError:
-            continue
+    rows = [{'name': item['friendlyName'], 'status': item['status'], 'groups': item['notificationGroups']} for item in channels.get('gcm', '')
+            if 'friendlyName' in item and 'status' in item and 'notificationGroups' in item]
+    report(rows, ['name', 'status', 'groups'], notification_line)
     return
 
 
-def camera_stream(sensor_id, sensor_exist):
+def camera_stream(registry):
     """Show camera details and current state."""
-    if not sensor_exist['camera']:
+    if not registry.exists('camera'):
         log('Camera'.ljust(17) + ' | ' + 'ERROR'.ljust(8) + ' | Not found', 3, 1)
-    if args.stream.upper() in sensor_id['yc01']:
-        mac = args.stream.upper()
-    else:
-        mac = sensor_id['yc01'][0]
+    mac = registry.select(args.stream, 'yc01').mac
     stream_data = rest(GET, URL_CAMERA + '/' + mac + '/liveview/start')
     for stream in ('m3u8', 'rtsp'):
         log('Stream'.ljust(17) + ' | ' + stream.upper().ljust(8) + ' | ' + stream_data['uri'][stream])
     return
 
 
-def record(sensor_id, sensor_exist):
+def record(registry):
     """Start or stop camera recording based on current state."""
-    if not sensor_exist['camera']:
+    if not registry.exists('camera'):
         log('Camera'.ljust(17) + ' | ' + 'ERROR'.ljust(8) + ' | Not found', 3, 1)
-    if args.record.upper() in sensor_id['yc01']:
-        mac = args.record.upper()
-    else:
-        mac = sensor_id['yc01'][0]
-    camera_status = rest(GET, URL_CAMERA + '/' + mac + '/recording/status')
-    if camera_status['description'] == 'Recording not started':
-        rest(GET, URL_CAMERA + '/' + mac + '/recording/start')
-        log('Camera recording'.ljust(17) + ' | ' + color('started'.ljust(8)) + ' | ' + mac)
-    if camera_status['description'] == 'Recording already started':
-        rest(GET, URL_CAMERA + '/' + mac + '/recording/stop')
-        log('Camera recording'.ljust(17) + ' | ' + color('stopped'.ljust(8)) + ' | ' + mac)
+    mac = registry.select(args.record, 'yc01').mac
+    state = camera_recording(mac)
+    if state is not None:
+        log('Camera recording'.ljust(17) + ' | ' + color(state.ljust(8)) + ' | ' + mac)
     return
 
 
-def getsnapshot(sensor_id, sensor_exist):
-    """Download snapshot from camera."""
-    if not sensor_exist['camera']:
-        log('Camera'.ljust(17) + ' | ' + 'ERROR'.ljust(8) + ' | Not found', 3, 1)
-    if args.snapshot.upper() in sensor_id['yc01']:
-        mac = args.snapshot.upper()
-    else:
-        mac = sensor_id['yc01'][0]
+def camera_recording(mac, wanted=None, end=1):
+    """Start or stop camera recording, toggling when wanted is None, and return 'started' or 'stopped'."""
+    camera_status = rest(GET, URL_CAMERA + '/' + mac + '/recording/status', end=end)
+    if camera_status is None:
+        return None
+    description = camera_status.get('description')
+    if description not in ('Recording already started', 'Recording not started'):
+        log('Camera recording'.ljust(17) + ' | ' + color('error'.ljust(8)) + ' | ' + mac + ' unknown status ' + str(description), 3)
+        return None
+    running = description == 'Recording already started'
+    if wanted is None:
+        wanted = 'stop' if running else 'start'
+    if running != (wanted == 'start'):
+        if rest(GET, URL_CAMERA + '/' + mac + '/recording/' + wanted, end=end) is None:
+            return None
+    return 'started' if wanted == 'start' else 'stopped'
+
+
+def snapshot_cameras(registry):
+    """Return cameras selected by snapshot option falling back to first camera."""
+    if args.snapshot.lower() == 'all':
+        return [device.mac for device in registry.of_type('yc01')]
+    macs = []
+    for key in args.snapshot.split(','):
+        device = registry.get(key.strip())
+        if device is not None and device.type == 'yc01':
+            if device.mac not in macs:
+                macs.append(device.mac)
+        elif key.strip():
+            log('Camera'.ljust(17) + ' | ' + color('warning'.ljust(8)) + ' | ' + key.strip() + ' not found')
+    return macs or [registry.of_type('yc01')[0].mac]
+
+
+def snapshot(mac):
+    """Download fresh snapshot of a single camera."""
     image_name = mac + '_' + time.strftime('%y%m%d') + '_' + time.strftime('%H%M%S') + '.jpg'
-    if filewritable('Snapshot image', image_name, 0):
-        log('Camera snapshot'.ljust(17) + ' | ' + color('download'.ljust(8)) + ' | ' + image_name)
-        with open(image_name, 'wb') as image:
-            image.write(rest(GET, URL_CAMERA + '/' + mac + '/snapshot?fresh=true'))
+    size = download(URL_CAMERA + '/' + mac + '/snapshot?fresh=true', image_name)
+    if size is not None:
+        log('Camera snapshot'.ljust(17) + ' | ' + color('download'.ljust(8)) + ' | ' + image_name + ' (' + str(size // 1024) + ' KB)')
+    return size
+
+
+def prune_snapshots(mac):
+    """Remove all but the most recent snapshots of camera."""
+    images = sorted(item for item in os.listdir('.') if item.startswith(mac + '_') and item.endswith('.jpg'))
+    for item in images[:-args.retain]:
+        try:
+            os.remove(item)
+        except OSError:
+            pass
+    return
+
+
+def getsnapshot(registry):
+    """Download snapshots from selected cameras concurrently, repeatedly when timelapse is set."""
+    if not registry.exists('camera'):
+        log('Camera'.ljust(17) + ' | ' + 'ERROR'.ljust(8) + ' | Not found', 3, 1)
+    macs = snapshot_cameras(registry)
+    if args.timelapse:
+        log('Timelapse'.ljust(17) + ' | ' + color('started'.ljust(8)) + ' | Every ' + str(args.timelapse) + 's, CTRL+C to exit')
+    try:
+        with ThreadPoolExecutor(max_workers=len(macs)) as pool:
+            while 1:
+                started = time.time()
+                list(pool.map(snapshot, macs))
+                if args.retain > 0:
+                    for mac in macs:
+                        prune_snapshots(mac)
+                if not args.timelapse:
+                    break
+                time.sleep(max(0, args.timelapse - (time.time() - started)))
+    except KeyboardInterrupt:
+        log('Program'.ljust(17) + ' | ' + color('halted'.ljust(8)) + ' | ' + 'CTRL+C', 0, 1)
     return
 
 
 def start_logger(logfile):
     """Setup log file handler."""
-    logger = logging.getLogger(__name__)
+    logger = LOGGER
     logger.setLevel(logging.INFO)
     logger.propagate = False
+    if logger.handlers:
+        return
     try:
-        filehandle = logging.FileHandler(logfile, 'a')
+        filehandle = logging.handlers.RotatingFileHandler(logfile, 'a', maxBytes=args.logsize * 1024 * 1024, backupCount=5)
     except IOError:
         print(Fore.RED + '[-] Unable to write log file ' + logfile)
         sys.exit('\n')
@@ -640,20 +1494,485 @@ def start_logger(logfile):
 
 
 def get_elements(elements_data):
-    """Write elements json object."""
-    if sys.version_info[0] < 3 or os.name == 'nt':
-        elements_data = unicode(elements_data)
+    """Write elements json object streaming it to file."""
     if filewritable('JSON file', args.elements, 0):
         log('JSON file'.ljust(17) + ' | ' + color('write'.ljust(8)) + ' | ' + args.elements)
-        with open(args.elements, 'w') as outfile:
-            json.dump(elements_data, outfile, indent=4, sort_keys=False, ensure_ascii=False)
+        with open(args.elements, 'w', encoding='utf-8') as outfile:
+            jsonlib.dump(elements_data, outfile)
+    return
+
+
+class ActionError(ValueError):
+    """Raised by actions on invalid parameters; code is the HTTP status reported by the server."""
+
+    def __init__(self, message, code=400):
+        ValueError.__init__(self, message)
+        self.code = code
+
+
+class State(object):
+    """Latest basestation, health, camera and elements state shared by server actions."""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.synclock = threading.Lock()
+        self.fetched = 0
+        self.synced = 0
+        self.basestation = self.status = None
+
+    def refresh(self, force=False):
+        """Fetch state concurrently when older than ttl."""
+        with self.lock:
+            if force or time.time() - self.fetched >= self.ttl:
+                basestation, status, cameras, elements = fetch_all([URL_BASE, URL_HEALTH, URL_CAMERA, URL_ELEMENTS], fresh=True, end=0)
+                if basestation is None or status is None:
+                    raise ActionError('state refresh failed', 502)
+                collect_hw(basestation, cameras, elements)
+                self.basestation, self.status, self.fetched = basestation, status, time.time()
+        return self
+
+    def seed(self, basestation, status):
+        """Use state just fetched elsewhere."""
+        self.basestation, self.status, self.fetched = basestation, status, time.time()
+        return self
+
+    def sync(self, store, count, group=None):
+        """Sync event store when last sync is older than ttl or store holds fewer than count events."""
+        with self.synclock:
+            if time.time() - self.synced >= self.ttl or store.count(group) < count and not store.meta('complete'):
+                sync_events(store, count=count, group=group)
+                self.synced = time.time()
+        return
+
+    def invalidate(self):
+        """Force refresh on next use."""
+        self.fetched = self.synced = 0
+
+
+def device_record(device):
+    """Return device summary with its watched state."""
+    from .diff import device_state
+    record = {'id': device.id, 'type': device.type, 'kind': device.friendly, 'name': device.name, 'source': device.source}
+    record.update(device_state(device))
+    return record
+
+
+def find_device(key, *kinds):
+    """Return device of given types by id, MAC or name, first of those types without key."""
+    if key is None:
+        devices = REGISTRY.of_type(*kinds)
+        if not devices:
+            raise ActionError('no ' + '/'.join(kinds) + ' installed', 404)
+        return devices[0]
+    device = REGISTRY.get(key)
+    if device is None or device.type not in kinds:
+        raise ActionError('unknown device ' + key, 404)
+    return device
+
+
+def choice(params, name, choices, default=None):
+    """Return validated parameter."""
+    value = params.get(name, default)
+    if value not in choices:
+        raise ActionError(name + ' must be one of ' + ', '.join(item for item in choices if item is not None))
+    return value
+
+
+def action_status(params):
+    """Return basestation, health and modus."""
+    STATE.refresh()
+    basestation = STATE.basestation[0]
+    return {'basestation': basestation['id'], 'status': basestation['status'], 'health': STATE.status['system_health'],
+            'message': STATE.status.get('status_msg_id', ''), 'modus': basestation['intrusion_settings']['active_mode'], 'updated': STATE.fetched}
+
+
+def action_sensors(params):
+    """Return all devices with their current state."""
+    STATE.refresh()
+    return {'devices': [device_record(device) for device in REGISTRY], 'updated': STATE.fetched}
+
+
+def action_events(params):
+    """Return most recent events from event store optionally filtered."""
+    from .eventstore import EventStore
+    from .filters import FilterError, compile_filters
+    try:
+        limit = int(params.get('limit', 10))
+        where = compile_filters([params['where']] if params.get('where') else None)
+    except (ValueError, FilterError) as error:
+        raise ActionError(str(error))
+    store = EventStore(EVENTFILE)
+    try:
+        STATE.sync(store, limit, params.get('filter'))
+        events = store.query(group=params.get('filter'), limit=None if where else limit)
+        if where is not None:
+            events = (item for item in events if where(item))
+        return {'events': list(itertools.islice(events, limit))}
+    finally:
+        store.close()
+
+
+def action_modus(params):
+    """Switch alarm modus."""
+    modus = choice(params, 'modus', ('home', 'away', 'custom', 'night'))
+    previous = STATE.refresh().basestation[0]['intrusion_settings']['active_mode']
+    settings = IntrusionSettings()
+    settings.activate(modus)
+    settings.messages.append('Status'.ljust(17) + ' | ' + color(STATE.status['system_health'].ljust(8)) + ' | Modus set from ' + color(previous) +
+                             ' to ' + color(modus))
+    write_settings(STATE.basestation, settings)
+    STATE.invalidate()
+    return {'modus': modus, 'previous': previous}
+
+
+def action_siren(params):
+    """Arm or disarm siren."""
+    state = choice(params, 'state', ('arm', 'disarm'))
+    STATE.refresh()
+    if not REGISTRY.exists('indoor_siren'):
+        raise ActionError('no siren installed', 404)
+    settings = IntrusionSettings()
+    settings.update(['home', 'away', 'custom', 'night'], sirens_on=str(state == 'arm').lower())
+    settings.messages.append('Siren'.ljust(17) + ' | ' + color((state + 'ED').ljust(8)) + ' | ')
+    write_settings(STATE.basestation, settings)
+    STATE.invalidate()
+    return {'siren': state}
+
+
+def action_plug(params):
+    """Switch plug on or off."""
+    state = choice(params, 'state', ('on', 'off'))
+    device = find_device(params.get('id'), 'sp02', 'sp01')
+    if switch_plug(STATE.refresh().basestation[0]['id'], device.id, state, end=0) is None:
+        raise ActionError('plug command failed', 502)
+    log('Plug'.ljust(17) + ' | ' + color(state.ljust(8)) + ' | ' + device.name)
+    return {'id': device.id, 'plug': state}
+
+
+def action_record(params):
+    """Start, stop or toggle camera recording."""
+    wanted = choice(params, 'state', ('start', 'stop', None))
+    device = find_device(params.get('mac'), 'yc01')
+    state = camera_recording(device.mac, wanted, end=0)
+    if state is None:
+        raise ActionError('recording command failed', 502)
+    log('Camera recording'.ljust(17) + ' | ' + color(state.ljust(8)) + ' | ' + device.mac)
+    return {'mac': device.mac, 'recording': state}
+
+
+def action_snapshot(params):
+    """Download snapshot of camera or all cameras into working directory."""
+    if params.get('mac', '').lower() == 'all':
+        macs = [device.mac for device in REGISTRY.of_type('yc01')]
+    else:
+        macs = [find_device(params.get('mac'), 'yc01').mac]
+    with ThreadPoolExecutor(max_workers=max(1, len(macs))) as pool:
+        sizes = list(pool.map(snapshot, macs))
+    return {'snapshots': [{'mac': mac, 'bytes': size} for mac, size in zip(macs, sizes)]}
+
+
+def describe(params):
+    """Return action parameters as short text."""
+    return ' '.join(str(params[key]) for key in sorted(params))
+
+
+def job_line(job, label):
+    """Return log line of scheduled job."""
+    return ('Scheduler'.ljust(17) + ' | ' + color(label.ljust(8)) + ' | ' + job['id'] + ' | ' + job['action'] + ' ' + describe(job['params']) + ' | ' +
+            time.strftime('%A %d %B %Y %H:%M:%S', time.localtime(job['due'])) + (' | repeat ' + str(job['repeat']) if job['repeat'] else ''))
+
+
+def action_jobs(params):
+    """Return scheduled jobs."""
+    return {'jobs': SCHEDULER.list()}
+
+
+def action_schedule(params):
+    """Schedule action at HH:MM or epoch, optionally repeated daily or every number of seconds."""
+    from .scheduler import next_clock
+    action, at = params.get('action'), str(params.get('at'))
+    if action not in ACTIONS or ACTIONS[action][0] != POST or action in ('schedule', 'unschedule'):
+        raise ActionError('action must be one of ' + ', '.join(sorted(name for name in ACTIONS if ACTIONS[name][0] == POST and 'schedule' not in name)))
+    if not isinstance(params.get('params', {}), dict):
+        raise ActionError('params must be an object')
+    try:
+        job = SCHEDULER.add(action, params.get('params'), next_clock(at) if istimeformat(at) else float(at), params.get('repeat'))
+    except ValueError as error:
+        raise ActionError('at must be HH:MM or epoch and repeat daily or seconds (' + str(error) + ')')
+    log(job_line(job, 'added'))
+    return job
+
+
+def action_unschedule(params):
+    """Remove scheduled job by id or all jobs."""
+    return {'removed': SCHEDULER.remove(params.get('id'))}
+
+
+ACTIONS = {
+    'status': (GET, action_status),
+    'sensors': (GET, action_sensors),
+    'events': (GET, action_events),
+    'modus': (POST, action_modus),
+    'siren': (POST, action_siren),
+    'plug': (POST, action_plug),
+    'record': (POST, action_record),
+    'snapshot': (POST, action_snapshot),
+    'jobs': (GET, action_jobs),
+    'schedule': (POST, action_schedule),
+    'unschedule': (POST, action_unschedule),
+}
+
+
+def dispatch(method, name, params):
+    """Run action and return HTTP status code and JSON result."""
+    if name not in ACTIONS:
+        return 404, {'error': 'unknown action ' + name, 'actions': sorted(ACTIONS)}
+    if ACTIONS[name][0] != method:
+        return 405, {'error': name + ' requires ' + ACTIONS[name][0].upper()}
+    try:
+        if ACTIONS[name][0] == POST:
+            STATE.refresh()
+        return 200, ACTIONS[name][1](params)
+    except ActionError as error:
+        return error.code, {'error': str(error)}
+    except (ConnectionFailure, SystemExit):
+        return 502, {'error': 'request to cloud failed'}
+
+
+def run_job(action, params):
+    """Execute scheduled action on current session."""
+    started = time.time()
+    code, result = dispatch(POST, action, params)
+    log('Scheduler'.ljust(17) + ' | ' + color(('ok' if code == 200 else 'error').ljust(8)) + ' | ' + action + ' ' + describe(params) + ' | ' +
+        (str(int((time.time() - started) * 1000)) + ' ms' if code == 200 else str(code) + ' ' + result.get('error', '')))
+    return
+
+
+def job_failed(job, error):
+    """Log scheduled job that raised."""
+    log('Scheduler'.ljust(17) + ' | ' + color('error'.ljust(8)) + ' | ' + job['action'] + ' ' + describe(job['params']) + ' | ' +
+        type(error).__name__ + ' ' + str(error))
+    return
+
+
+def scheduled_actions():
+    """Return (action, params) pairs for actions given on command line."""
+    actions = []
+    if args.modus:
+        actions.append(('modus', {'modus': args.modus}))
+    if args.siren:
+        actions.append(('siren', {'state': args.siren}))
+    if args.plug:
+        actions.append(('plug', dict({'state': args.plug}, **({'id': args.sensorid} if args.sensorid else {}))))
+    if args.record:
+        actions.append(('record', {'mac': args.record}))
+    if args.snapshot:
+        actions.append(('snapshot', {'mac': args.snapshot}))
+    return actions
+
+
+def schedule_jobs():
+    """Maintain jobs of daemon as requested on command line."""
+    if args.remove:
+        removed = client_call(POST, 'unschedule')['removed']
+        for job in removed:
+            log(job_line(job, 'removed'))
+        if not removed:
+            log('Scheduler'.ljust(17) + ' | ' + color('warning'.ljust(8)) + ' | ' + 'No items found for removal')
+    if args.cronjob:
+        actions = scheduled_actions()
+        if not actions:
+            log('Scheduler'.ljust(17) + ' | ' + 'ERROR'.ljust(8) + ' | Requires --modus, --siren, --plug, --record or --snapshot', 3, 1)
+        for action, params in actions:
+            job = client_call(POST, 'schedule', {'action': action, 'params': params, 'at': args.cronjob, 'repeat': args.repeat})
+            log(job_line(job, 'scheduled'))
+    if args.jobs:
+        for job in client_call(GET, 'jobs')['jobs']:
+            log(job_line(job, 'pending'))
+    return
+
+
+def serve_state(auth_time):
+    """Start local API server and scheduler and keep session alive unless another loop does."""
+    global STATE, SERVER, SCHEDULER  # pylint: disable=global-statement
+    from .scheduler import Scheduler
+    from .server import serve
+    STATE = State(args.refresh)
+    STATE.refresh(force=True)
+    if SCHEDULER is None:
+        SCHEDULER = Scheduler(SCHEDULEFILE, run_job, warn=job_failed).start()
+    schedule_jobs()
+    if SERVER is None:
+        try:
+            token = None
+            if args.serve.isdigit():
+                token = binascii.hexlify(os.urandom(24)).decode('ascii')
+                write_private(TOKENFILE, token)
+            SERVER = serve(args.serve, dispatch, token)
+        except (IOError, OSError) as error:
+            log('API server'.ljust(17) + ' | ' + color('error'.ljust(8)) + ' | ' + str(error), 3, 1)
+    log('API server'.ljust(17) + ' | ' + color('started'.ljust(8)) + ' | ' +
+        ('http://127.0.0.1:' + args.serve if args.serve.isdigit() else args.serve) + ', CTRL+C to exit')
+    if args.monitor or args.watch or args.recorder:
+        return
+    attempt = 0
+    try:
+        while 1:
+            time.sleep(max(1, min(60, AUTH_EXPIRE - (time.time() - auth_time))))
+            if time.time() - auth_time >= AUTH_EXPIRE:
+                try:
+                    auth_time = authenticate(reauthenticate=True)
+                    attempt = 0
+                except ConnectionFailure:
+                    attempt = recover(attempt)
+    except KeyboardInterrupt:
+        log('Program'.ljust(17) + ' | ' + color('halted'.ljust(8)) + ' | ' + 'CTRL+C', 0, 1)
+    return
+
+
+def invoke(method, name, params=None):
+    """Invoke action on local server, or in-process when serving, and return status code and result."""
+    from .server import call
+    if args.client is None:
+        return dispatch(method, name, params or {})
+    try:
+        token = None
+        if args.client.isdigit():
+            with open(TOKENFILE, 'r') as target:
+                token = target.read().strip()
+        return call(args.client, method, name, params, token=token)
+    except (IOError, OSError, ValueError) as error:
+        return 503, {'error': args.client + ' ' + str(error)}
+
+
+def client_call(method, name, params=None):
+    """Invoke action exiting on failure."""
+    code, result = invoke(method, name, params)
+    if code != 200:
+        log(name.title().ljust(17) + ' | ' + color('error'.ljust(8)) + ' | ' + str(code) + ' ' + result.get('error', ''), 3, 1)
+    return result
+
+
+def batch_requests(command, devices):
+    """Return (target, action, params) for command with target all expanded and names resolved to device ids."""
+    from .batch import VERBS
+    if command.action == 'modus':
+        return [(None, 'modus', {'modus': command.value})]
+    if command.action == 'siren':
+        return [(None, 'siren', {'state': command.value})]
+    if command.target.lower() == 'all':
+        targets = [device['id'] for device in devices if device['type'] in VERBS[command.action][0]]
+    else:
+        names = dict((key.lower(), device['id']) for device in devices for key in (device['id'], device['name']) if key)
+        targets = [names.get(command.target.lower(), command.target)]
+    key = 'id' if command.action == 'plug' else 'mac'
+    return [(target.lower(), command.action, dict({key: target}, **({'state': command.value} if command.value else {}))) for target in targets]
+
+
+def batch_waves(group, devices):
+    """Split requests of group in waves that run concurrently, each device at most once per wave; return waves and unmatched count."""
+    waves, seen, unmatched = [[]], set(), 0
+    for command in group:
+        pending = batch_requests(command, devices)
+        if not pending:
+            unmatched += 1
+            log('Batch'.ljust(17) + ' | ' + color('error'.ljust(8)) + ' | line ' + str(command.line) + ' ' + command.text + ' | no matching devices')
+        for target, action, params in pending:
+            if target is not None and target in seen:
+                waves.append([])
+                seen = set()
+            seen.add(target)
+            waves[-1].append((command, action, params))
+    return [wave for wave in waves if wave], unmatched
+
+
+def run_batch(basestation_data=None, status_data=None):
+    """Run commands from file or stdin over one session and state, device commands of a group concurrently."""
+    global STATE  # pylint: disable=global-statement
+    from .batch import BatchError, groups, parse
+    try:
+        if args.batch == '-':
+            commands = parse(sys.stdin.readlines())
+        else:
+            with io.open(args.batch, encoding='utf-8') as source:
+                commands = parse(source.readlines())
+    except (IOError, OSError, BatchError) as error:
+        log('Batch'.ljust(17) + ' | ' + color('error'.ljust(8)) + ' | ' + str(error), 3, 1)
+    if args.client is None:
+        STATE = State(args.refresh).seed(basestation_data, status_data)
+    if args.client is None:
+        devices = [{'id': device.id, 'type': device.type, 'name': device.name} for device in REGISTRY]
+    else:
+        devices = client_call(GET, 'sensors')['devices']
+    started, done, failed = time.time(), 0, 0
+    waves = []
+    for group in groups(commands):
+        group_waves, unmatched = batch_waves(group, devices)
+        waves.extend(group_waves)
+        failed += unmatched
+    for jobs in waves:
+        with ThreadPoolExecutor(max_workers=min(POOL_SIZE, len(jobs))) as pool:
+            results = list(pool.map(lambda job: invoke(POST, job[1], job[2]), jobs))
+        for (command, action, params), (code, result) in zip(jobs, results):
+            if code == 200:
+                done += 1
+                if args.client:
+                    log('Batch'.ljust(17) + ' | ' + color('ok'.ljust(8)) + ' | line ' + str(command.line) + ' ' + action + ' ' + describe(params))
+            else:
+                failed += 1
+                log('Batch'.ljust(17) + ' | ' + color('error'.ljust(8)) + ' | line ' + str(command.line) + ' ' + action + ' ' + describe(params) +
+                    ' | ' + str(code) + ' ' + result.get('error', ''))
+    log('Batch'.ljust(17) + ' | ' + color(('error' if failed else 'ok').ljust(8)) + ' | ' + str(done) + ' of ' + str(done + failed) +
+        ' commands in ' + str(int((time.time() - started) * 1000)) + ' ms', 3 if failed else 0, 1 if failed else 0)
+    return
+
+
+def client():
+    """Thin client answering from a running --serve instance."""
+    status = client_call(GET, 'status')
+    log('Basestation'.ljust(17) + ' | ' + color(status['status'].ljust(8)) + ' | ' + status['basestation'])
+    log('Status'.ljust(17) + ' | ' + color(status['health'].ljust(8)) + ' | Modus ' + color(status['modus']))
+    if args.remove or args.cronjob or args.jobs:
+        schedule_jobs()
+    if args.batch:
+        run_batch()
+    if args.modus and not args.cronjob:
+        result = client_call(POST, 'modus', {'modus': args.modus})
+        log('Status'.ljust(17) + ' | ' + color(status['health'].ljust(8)) + ' | Modus set from ' + color(result['previous']) + ' to ' + color(args.modus))
+    if args.siren and not args.cronjob:
+        client_call(POST, 'siren', {'state': args.siren})
+        log('Siren'.ljust(17) + ' | ' + color((args.siren + 'ED').ljust(8)) + ' | ')
+    if args.plug and not args.cronjob:
+        result = client_call(POST, 'plug', dict({'state': args.plug}, **({'id': args.sensorid} if args.sensorid else {})))
+        log('Plug'.ljust(17) + ' | ' + color(args.plug.ljust(8)) + ' | ' + result['id'])
+    if args.record and not args.cronjob:
+        result = client_call(POST, 'record', {'mac': args.record})
+        log('Camera recording'.ljust(17) + ' | ' + color(result['recording'].ljust(8)) + ' | ' + result['mac'])
+    if args.snapshot and not args.cronjob:
+        for item in client_call(POST, 'snapshot', {'mac': args.snapshot})['snapshots']:
+            log('Camera snapshot'.ljust(17) + ' | ' + color(('download' if item['bytes'] is not None else 'error').ljust(8)) + ' | ' + item['mac'])
+    if args.sensor:
+        devices = client_call(GET, 'sensors')['devices']
+        for device in devices:
+            device.update((key, round(value, 1)) for key, value in list(device.items()) if isinstance(value, float))
+        fields = ['name', 'kind', 'type', 'status', 'source']
+        fields += sorted(set(key for device in devices for key in device) - set(fields + ['id'])) + ['id']
+        report(devices, fields, lambda device: device['name'].ljust(17) + ' | ' + color(str(device.get('status')).ljust(8)) + ' | ' +
+               ' | '.join(key + ' ' + str(device[key]) for key in fields[5:-1] if key in device) + (' | ' + device['id'].upper() if args.sensor > 1 else ''))
+    if args.events is not None:
+        params = {'limit': args.events}
+        params.update(dict((key, value) for key, value in (('filter', args.filter), ('where', ' or '.join('(' + item + ')' for item in args.where or [])))
+                           if value))
+        report(client_call(GET, 'events', params)['events'], EXPORT_FIELDS, event_line, event_record)
+    print(file=console())
     return
 
 
 def base():
     """Base program."""
     pb_body = None
-    print('\n' + 'Gigaset Elements - Command-line Interface v' + _VERSION_ + '\n')
+    print('\n' + 'Gigaset Elements - Command-line Interface v' + _VERSION_ + '\n', file=console())
     try:
         if args.log:
             start_logger(args.log)
@@ -661,48 +1980,54 @@ def base():
         if args.daemon:
             log('Run as background'.ljust(17) + ' | ' + color('daemon'.ljust(8)) + ' | ' + args.pid)
 
-        if args.remove:
+        if args.remove and not args.serve:
             remove_cron()
 
-        if args.cronjob:
+        if args.cronjob and not args.serve:
             add_cron()
 
         if not args.noupdate:
             check_version()
 
-        auth_time = authenticate()
+        auth_time, basestation_data, status_data, camera_data, elements_data = connect()
 
-        basestation_data, status_data, camera_data, elements_data = systemstatus()
+        registry = collect_hw(basestation_data, camera_data, elements_data)
 
-        sensor_id, sensor_exist = collect_hw(basestation_data, camera_data)
+        settings = IntrusionSettings()
 
         if args.modus is not None and args.cronjob is None:
-            modus_switch(basestation_data, status_data)
+            modus_switch(basestation_data, status_data, settings)
             if args.sensor is not True:
                 pb_body = 'Status ' + status_data['system_health'].upper() + ' | Modus set from ' + \
                     basestation_data[0]['intrusion_settings']['active_mode'].upper() + ' to ' + args.modus.upper()
 
+        if args.delay is not None:
+            set_delay(settings)
+
+        if args.privacy is not None:
+            set_privacy(settings)
+
+        if args.siren and args.cronjob is None:
+            siren(settings, registry)
+
+        if settings:
+            write_settings(basestation_data, settings)
+
         if args.sensor:
-            sensor(basestation_data, sensor_exist, camera_data, elements_data)
+            sensor(basestation_data, registry)
             if status_data['status_msg_id'] == '':
                 status_data['status_msg_id'] = '\u2713'
             pb_body = 'Status ' + status_data['system_health'].upper() + ' | ' + status_data['status_msg_id'].upper() + \
                 ' | Modus ' + basestation_data[0]['intrusion_settings']['active_mode'].upper()
 
-        if args.delay is not None:
-            set_delay(basestation_data)
-
-        if args.privacy is not None:
-            set_privacy(basestation_data)
-
         if args.stream:
-            camera_stream(sensor_id, sensor_exist)
+            camera_stream(registry)
 
-        if args.record:
-            record(sensor_id, sensor_exist)
+        if args.record and args.cronjob is None:
+            record(registry)
 
-        if args.snapshot:
-            getsnapshot(sensor_id, sensor_exist)
+        if args.snapshot and args.cronjob is None:
+            getsnapshot(registry)
 
         if args.notifications:
             notifications()
@@ -710,11 +2035,8 @@ def base():
         if args.rules:
             rules(basestation_data)
 
-        if args.siren:
-            siren(basestation_data, sensor_exist)
-
-        if args.plug:
-            plug(basestation_data, sensor_exist, sensor_id)
+        if args.plug and args.cronjob is None:
+            plug(basestation_data, registry)
 
         if not args.quiet and None not in (args.notify, pb_body):
             pb_message(pb_body)
@@ -724,6 +2046,9 @@ def base():
         else:
             list_events()
 
+        if args.export:
+            export_events()
+
         if args.elements:
             get_elements(elements_data)
 
@@ -733,19 +2058,98 @@ def base():
         if args.end:
             end_alarm()
 
+        if args.batch:
+            run_batch(basestation_data, status_data)
+
+        if args.query:
+            query_readings()
+
+        if args.serve:
+            serve_state(auth_time)
+
+        if args.recorder:
+            recorder(auth_time, registry)
+
+        if args.watch:
+            watch(auth_time, registry)
+
         if args.monitor:
             monitor(auth_time, basestation_data, status_data)
-        print()
+        print(file=console())
     except KeyboardInterrupt:
         log('Program'.ljust(17) + ' | ' + color('halted'.ljust(8)) + ' | ' + 'CTRL+C', 0, 1, 2)
 
 
-def main():
+def show_stats():
+    """Log request statistics per endpoint."""
+    for method, path, entry in METRICS.summary():
+        log('Statistics'.ljust(17) + ' | ' + str(entry['count']).ljust(8) + ' | ' + method.upper() + ' ' + path + ' | avg ' +
+            str(int(entry['sum'] * 1000 / entry['count'])) + ' ms | max ' + str(int(entry['max'] * 1000)) + ' ms | errors ' + str(entry['errors']) +
+            ' | retries ' + str(entry['retries']) + ' | ' + str(entry['bytes']) + ' bytes')
+    return
+
+
+def export_metrics():
+    """Write request metrics in Prometheus text format to file."""
+    try:
+        write_atomic(args.prometheus, METRICS.prometheus())
+    except (IOError, OSError) as error:
+        log('Metrics'.ljust(17) + ' | ' + color('error'.ljust(8)) + ' | ' + str(error))
+    return
+
+
+def start_metrics():
+    """Register statistics output at exit and start Prometheus exposition."""
+    if args.stats:
+        atexit.register(show_stats)
+    if args.prometheus and args.prometheus.isdigit():
+        METRICS.serve(int(args.prometheus))
+        log('Metrics'.ljust(17) + ' | ' + color('started'.ljust(8)) + ' | http://127.0.0.1:' + args.prometheus + '/metrics')
+    elif args.prometheus:
+        atexit.register(export_metrics)
+    return
+
+
+def recover(attempt):
+    """Wait before next attempt after a connection failure, at least until the circuit breaker probes again, and return incremented attempt counter."""
+    delay = max(backoff_delay(attempt), BREAKER.remaining())
+    log('Connection'.ljust(17) + ' | ' + color('retry'.ljust(8)) + ' | ' + 'Attempt ' + str(attempt + 1) + ' in ' + str(round(delay, 1)) + ' seconds')
+    time.sleep(delay)
+    return attempt + 1
+
+
+def connect():
+    """Authenticate and fetch system state, retrying connection failures, and return authentication time and state."""
+    attempt = 0
+    while 1:
+        try:
+            auth_time = authenticate()
+            return (auth_time,) + tuple(systemstatus())
+        except ConnectionFailure:
+            attempt = recover(attempt)
+
+
+def supervise():
+    """Run base program; connecting and the monitor, watch, recorder and serve loops recover in-process from connection failures."""
+    start_metrics()
+    try:
+        base()
+    except ConnectionFailure as error:
+        log('Connection'.ljust(17) + ' | ' + color('error'.ljust(8)) + ' | ' + str(error) + ', completed actions are not repeated', 3, 1)
+    except KeyboardInterrupt:
+        log('Program'.ljust(17) + ' | ' + color('halted'.ljust(8)) + ' | ' + 'CTRL+C', 0, 1, 2)
+
+
+def main(argv=None):
     """Main program."""
+    configure(parse_args(argv))
+    init(autoreset=True)
+    if args.client:
+        return client()
     if args.daemon and os.name != 'nt':
         print()
         if filewritable('PID file', args.pid):
-            daemon = Daemonize(app='gigasetelements-cli', pid=args.pid, action=base, auto_close_fds=False, chdir=os.path.dirname(os.path.abspath(sys.argv[0])))
+            daemon = require('daemonize').Daemonize(app='gigasetelements-cli', pid=args.pid, action=supervise, auto_close_fds=False, chdir=os.path.dirname(os.path.abspath(sys.argv[0])))
             daemon.start()
     else:
-        base()
+        supervise()
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+
+"""gigasetelements.jsonlib: JSON backed by orjson or ujson when installed, stdlib otherwise."""
+
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+if orjson is not None:
+    BACKEND = 'orjson'
+elif ujson is not None:
+    BACKEND = 'ujson'
+else:
+    BACKEND = 'json'
+
+
+def loads(data):
+    """Decode JSON document given as text or UTF-8 bytes."""
+    if orjson is not None:
+        return orjson.loads(data)
+    if ujson is not None:
+        return ujson.loads(data)
+    if isinstance(data, bytes):
+        data = data.decode('utf-8')
+    return json.loads(data)
+
+
+def dumps(obj):
+    """Encode object as compact JSON text falling back to stdlib for types the fast backend rejects."""
+    try:
+        if orjson is not None:
+            return orjson.dumps(obj).decode('utf-8')
+        if ujson is not None:
+            return ujson.dumps(obj, ensure_ascii=False)
+    except (TypeError, ValueError, OverflowError):
+        pass
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False)
+
+
+def dump(obj, target, indent=4):
+    """Write indented JSON to text file using the fast backend when installed (orjson always indents by two)."""
+    try:
+        if orjson is not None:
+            data = orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+            if getattr(target, 'buffer', None) is not None and (target.encoding or '').lower().replace('-', '') == 'utf8':
+                target.flush()
+                target.buffer.write(data)
+            else:
+                target.write(data.decode('utf-8'))
+            return
+        if ujson is not None:
+            target.write(ujson.dumps(obj, indent=indent, ensure_ascii=False))
+            return
+    except (TypeError, ValueError, OverflowError):
+        pass
+    json.dump(obj, target, indent=indent, ensure_ascii=False)
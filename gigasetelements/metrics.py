@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+
+
+"""gigasetelements.metrics: per endpoint request statistics."""
+
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+
+import re
+import threading
+
+try:
+    from urllib.parse import urlparse
+except ImportError:
+    from urlparse import urlparse
+
+
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+IDENTIFIER = re.compile(r'^(?!v\d+$).*\d')
+
+
+def endpoint(url):
+    """Reduce URL to host and path with identifiers replaced so requests group per endpoint."""
+    parts = urlparse(url)
+    path = '/'.join(':id' if IDENTIFIER.match(segment) else segment for segment in parts.path.split('/'))
+    return parts.netloc + path
+
+
+class Metrics(object):
+    """Thread-safe latency histograms and counters keyed on method and endpoint."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.series = {}
+
+    def entry(self, method, url):
+        """Return statistics record of endpoint creating it when needed."""
+        key = (method, endpoint(url))
+        if key not in self.series:
+            self.series[key] = {'count': 0, 'sum': 0.0, 'max': 0.0, 'buckets': [0] * len(BUCKETS), 'status': {}, 'errors': 0,
+                                'retries': 0, 'bytes': 0}
+        return self.series[key]
+
+    def observe(self, method, url, status, seconds, size):
+        """Record a finished request; status None denotes a connection error."""
+        with self.lock:
+            entry = self.entry(method, url)
+            entry['count'] += 1
+            entry['sum'] += seconds
+            entry['max'] = max(entry['max'], seconds)
+            entry['bytes'] += size
+            for index, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    entry['buckets'][index] += 1
+            label = 'error' if status is None else str(status)
+            entry['status'][label] = entry['status'].get(label, 0) + 1
+            if status is None or status >= 400:
+                entry['errors'] += 1
+
+    def retry(self, method, url):
+        """Record a retried request."""
+        with self.lock:
+            self.entry(method, url)['retries'] += 1
+
+    def summary(self):
+        """Return list of (method, endpoint, record) sorted on total time spent."""
+        with self.lock:
+            items = [(key[0], key[1], dict(value, status=dict(value['status']), buckets=list(value['buckets']))) for key, value in self.series.items()]
+        return sorted(items, key=lambda item: -item[2]['sum'])
+
+    def prometheus(self):
+        """Render statistics in Prometheus text exposition format."""
+        lines = []
+        series = [('method="' + method.upper() + '",endpoint="' + path + '"', entry) for method, path, entry in self.summary()]
+        lines.extend(['# HELP gigasetelements_requests_total Requests per status code', '# TYPE gigasetelements_requests_total counter'])
+        for label, entry in series:
+            for status, count in sorted(entry['status'].items()):
+                lines.append('gigasetelements_requests_total{' + label + ',status="' + status + '"} ' + str(count))
+        lines.extend(['# HELP gigasetelements_request_duration_seconds Request latency',
+                      '# TYPE gigasetelements_request_duration_seconds histogram'])
+        for label, entry in series:
+            for bound, count in zip(BUCKETS, entry['buckets']):
+                lines.append('gigasetelements_request_duration_seconds_bucket{' + label + ',le="' + str(bound) + '"} ' + str(count))
+            lines.append('gigasetelements_request_duration_seconds_bucket{' + label + ',le="+Inf"} ' + str(entry['count']))
+            lines.append('gigasetelements_request_duration_seconds_sum{' + label + '} ' + repr(entry['sum']))
+            lines.append('gigasetelements_request_duration_seconds_count{' + label + '} ' + str(entry['count']))
+        for name, field, text in (('request_errors_total', 'errors', 'Failed requests'), ('request_retries_total', 'retries', 'Retried requests'),
+                                  ('response_bytes_total', 'bytes', 'Response body bytes')):
+            lines.extend(['# HELP gigasetelements_' + name + ' ' + text, '# TYPE gigasetelements_' + name + ' counter'])
+            for label, entry in series:
+                lines.append('gigasetelements_' + name + '{' + label + '} ' + str(entry[field]))
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port, address='127.0.0.1'):
+        """Expose statistics over HTTP on local port from a background thread."""
+        try:
+            from http.server import BaseHTTPRequestHandler, HTTPServer
+        except ImportError:
+            from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """Answer every GET with current statistics."""
+
+            def do_GET(self):  # pylint: disable=invalid-name
+                """Send metrics."""
+                body = metrics.prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):  # pylint: disable=arguments-differ
+                return
+
+        server = HTTPServer((address, port), Handler)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return server
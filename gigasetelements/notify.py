@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+
+"""gigasetelements.notify: queued, coalesced and rate limited push notifications."""
+
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+
+import collections
+import time
+
+from .workers import QueueWorker
+
+
+class Notifier(QueueWorker):
+    """Push messages from a background queue.
+
+    Messages arriving within window seconds of each other are combined into a
+    single push per target and pushes are spaced at least interval seconds
+    apart. send(target, title, body) returns a number of seconds to hold off
+    when the provider rate limited the push, otherwise None.
+    """
+
+    def __init__(self, send, title, window=10.0, interval=5.0, maxsize=1000, lines=20):
+        QueueWorker.__init__(self, 'notify', maxsize=maxsize, batch=maxsize, drop='oldest', linger=window)
+        self.send = send
+        self.title = title
+        self.interval = interval
+        self.lines = lines
+        self.last = 0.0
+        self.pushed = 0
+
+    def notify(self, target, message):
+        """Queue message for target without blocking."""
+        self.put((target, message))
+
+    def pace(self):
+        """Sleep until next push is allowed."""
+        delay = self.last + self.interval - time.time()
+        if delay > 0:
+            time.sleep(delay)
+
+    def compose(self, messages):
+        """Return title and body for one or more messages."""
+        if len(messages) == 1:
+            return self.title, messages[0]
+        body = messages[:self.lines]
+        if len(messages) > self.lines:
+            body.append('... and ' + str(len(messages) - self.lines) + ' more')
+        return self.title + ' (' + str(len(messages)) + ' events)', '\n'.join(body)
+
+    def handle(self, items):
+        grouped = collections.OrderedDict()
+        for target, message in items:
+            grouped.setdefault(target, []).append(message)
+        for target, messages in grouped.items():
+            title, body = self.compose(messages)
+            for _ in range(2):
+                self.pace()
+                holdoff = self.send(target, title, body)
+                self.last = time.time()
+                if not holdoff:
+                    self.pushed += 1
+                    break
+                self.last += holdoff
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+
+"""gigasetelements.poller: adaptive, checkpointed event polling."""
+
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+
+import collections
+import json
+import time
+
+from .eventstore import event_key
+from .utils import write_private
+
+
+class EventPoller(object):
+    """Poll events newer than a persisted checkpoint backing off while idle."""
+
+    def __init__(self, fetch, checkpoint=None, min_interval=1.0, max_interval=10.0, backoff=1.5, remember=1000):
+        self.fetch = fetch
+        self.checkpoint = checkpoint
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.backoff = backoff
+        self.remember = remember
+        self.interval = min_interval
+        self.seen = collections.OrderedDict()
+        self.from_ts = int(time.time()) * 1000
+        self.load()
+
+    def load(self):
+        """Resume from checkpoint file if present."""
+        if self.checkpoint is None:
+            return
+        try:
+            with open(self.checkpoint, 'r') as target:
+                state = json.load(target)
+        except (IOError, OSError, ValueError):
+            return
+        self.from_ts = int(state['from_ts'])
+        for key in state.get('seen', []):
+            self.seen[key] = self.from_ts
+
+    def save(self):
+        """Write checkpoint holding cursor and keys of events sharing the cursor timestamp."""
+        if self.checkpoint is None:
+            return
+        boundary = [key for key, ts in self.seen.items() if ts == self.from_ts]
+        write_private(self.checkpoint, json.dumps({'from_ts': self.from_ts, 'seen': boundary}))
+
+    def poll(self):
+        """Drain all unseen events since cursor and return them oldest first."""
+        events = [item for item in self.fetch(self.from_ts, int(time.time() * 1000)) if event_key(item) not in self.seen]
+        events.sort(key=lambda item: int(item['ts']))
+        for item in events:
+            self.seen[event_key(item)] = int(item['ts'])
+        while len(self.seen) > self.remember:
+            self.seen.popitem(last=False)
+        if events:
+            self.from_ts = max(self.from_ts, int(events[-1]['ts']))
+            self.interval = self.min_interval
+            self.save()
+        else:
+            self.interval = min(self.max_interval, self.interval * self.backoff)
+        return events
+
+    def wait(self):
+        """Sleep for current polling interval."""
+        time.sleep(self.interval)
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+
+
+"""gigasetelements.registry: indexed registry of installed devices."""
+
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+
+import collections
+
+
+SENSOR_FRIENDLY = {'ws02': 'window_sensor', 'ps01': 'presence_sensor', 'ps02': 'presence_sensor', 'ds01': 'door_sensor',
+                   'ds02': 'door_sensor', 'is01': 'indoor_siren', 'sp01': 'smart_plug', 'sp02': 'smart_plug', 'bn01': 'button',
+                   'yc01': 'camera', 'sd01': 'smoke', 'um01': 'umos', 'hb01': 'hue_bridge', 'hb01.hl01': 'hue_light',
+                   'bs01': 'base_station', 'wd01': 'water_sensor', 'cl01': 'climate_sensor', 'ts01': 'thermostat'}
+
+FRIENDLY_TYPES = {}
+for _kind, _friendly in SENSOR_FRIENDLY.items():
+    FRIENDLY_TYPES.setdefault(_friendly, []).append(_kind)
+
+SOURCES = {
+    'sensor': lambda item: (item['id'], None, item['type'], item.get('friendly_name', item['type']), item.get('status'),
+                            item.get('firmware_status')),
+    'camera': lambda item: (item['id'], item['id'].upper(), 'yc01', item.get('friendly_name', 'camera'), item.get('status'),
+                            item.get('firmware_status')),
+    'element': lambda item: (item['id'], None, item['type'].split('.', 1)[-1], item.get('friendlyName', item['type']), item.get('connectionStatus'),
+                             item.get('firmwareStatus')),
+}
+
+
+class Device(object):
+    """Single sensor, camera or element with a reference to its latest raw state."""
+
+    __slots__ = ('id', 'mac', 'type', 'name', 'status', 'firmware', 'source', 'data')
+
+    def __init__(self, ident, mac, kind, source):
+        self.id = ident
+        self.mac = mac
+        self.type = kind
+        self.source = source
+        self.name = self.status = self.firmware = self.data = None
+
+    @property
+    def friendly(self):
+        """Return friendly type name."""
+        return SENSOR_FRIENDLY.get(self.type, self.type)
+
+    def __repr__(self):
+        return 'Device(%r, %r, %r)' % (self.id, self.type, self.name)
+
+
+class Registry(object):
+    """Devices of one installation indexed by id, MAC address, type and friendly name."""
+
+    def __init__(self):
+        self.by_id = collections.OrderedDict()
+        self.by_mac = {}
+        self.by_name = {}
+        self.by_type = {}
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def __iter__(self):
+        return iter(list(self.by_id.values()))
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def update(self, source, items):
+        """Merge latest state of one source updating changed devices in place and dropping vanished ones."""
+        fields = SOURCES[source]
+        seen = set()
+        for item in items:
+            try:
+                ident, mac, kind, name, status, firmware = fields(item)
+            except (KeyError, AttributeError, TypeError):
+                continue
+            key = ident.lower()
+            seen.add(key)
+            device = self.by_id.get(key)
+            if device is None or device.type != kind:
+                if device is not None:
+                    self.remove(key)
+                device = Device(ident, mac, kind, source)
+                self.by_id[key] = device
+                self.by_type.setdefault(kind, []).append(device)
+                if mac:
+                    self.by_mac[mac.lower()] = device
+            if device.name != name:
+                if device.name is not None and self.by_name.get(device.name.lower()) is device:
+                    del self.by_name[device.name.lower()]
+                self.by_name[name.lower()] = device
+            device.name, device.status, device.firmware, device.data = name, status, firmware, item
+        for key in [key for key, device in self.by_id.items() if device.source == source and key not in seen]:
+            self.remove(key)
+        return self
+
+    def remove(self, key):
+        """Drop device and its index entries."""
+        device = self.by_id.pop(key)
+        self.by_type[device.type].remove(device)
+        if not self.by_type[device.type]:
+            del self.by_type[device.type]
+        if device.mac:
+            self.by_mac.pop(device.mac.lower(), None)
+        if device.name is not None and self.by_name.get(device.name.lower()) is device:
+            del self.by_name[device.name.lower()]
+
+    def get(self, key):
+        """Return device by id, MAC address or friendly name ignoring case."""
+        if key is None:
+            return None
+        key = key.lower()
+        return self.by_id.get(key) or self.by_mac.get(key) or self.by_name.get(key)
+
+    def of_type(self, *kinds):
+        """Return devices of given types in registration order."""
+        return [device for kind in kinds for device in self.by_type.get(kind, [])]
+
+    def of_source(self, source):
+        """Return devices originating from source."""
+        return [device for device in self.by_id.values() if device.source == source]
+
+    def exists(self, friendly):
+        """Test if any device of friendly type such as camera or smart_plug is installed."""
+        return any(kind in self.by_type for kind in FRIENDLY_TYPES.get(friendly, []))
+
+    def select(self, key, *kinds):
+        """Return device matching key when it is of given types, else first device of those types."""
+        device = self.get(key)
+        if device is not None and device.type in kinds:
+            return device
+        devices = self.of_type(*kinds)
+        return devices[0] if devices else None
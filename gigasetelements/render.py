@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+
+
+"""gigasetelements.render: machine readable output of report rows."""
+
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+
+import csv
+import io
+
+from . import jsonlib
+
+
+FORMATS = ('color', 'json', 'csv', 'table')
+
+
+def cell(value):
+    """Return value as plain text."""
+    if value is None:
+        return ''
+    if isinstance(value, (list, tuple)):
+        return ' '.join(cell(item) for item in value)
+    return '%s' % (value,)
+
+
+def columns(rows, fields):
+    """Return fields holding a value in at least one row."""
+    return [field for field in fields if any(row.get(field) not in (None, '', []) for row in rows)]
+
+
+def render(rows, fields, fmt):
+    """Return rows as JSON array, CSV with header or aligned text table limited to fields."""
+    rows = list(rows)
+    if fmt == 'json':
+        return jsonlib.dumps([dict((field, row.get(field)) for field in fields) for row in rows]) + '\n'
+    if fmt == 'csv':
+        output = io.StringIO()
+        writer = csv.writer(output, lineterminator='\n')
+        writer.writerow(fields)
+        writer.writerows([cell(row.get(field)) for field in fields] for row in rows)
+        return output.getvalue()
+    fields = columns(rows, fields)
+    table = [[field.upper() for field in fields]] + [[cell(row.get(field)) for field in fields] for row in rows]
+    widths = [max(len(line[index]) for line in table) for index in range(len(fields))]
+    return ''.join('  '.join(value.ljust(width) for value, width in zip(line, widths)).rstrip() + '\n' for line in table)
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+
+"""gigasetelements.retry: request retry policy and circuit breaker."""
+
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+
+import email.utils
+import random
+import threading
+import time
+
+
+IDEMPOTENT = frozenset(['get', 'head', 'delete', 'put'])
+TRANSIENT = frozenset([429, 500, 502, 503, 504])
+REFUSED = frozenset([429, 503])
+
+
+def retry_after(value):
+    """Return seconds to wait from a Retry-After header holding seconds or an HTTP date, None when absent or invalid."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        parsed = email.utils.parsedate_tz(value)
+        if parsed is None:
+            return None
+        return max(0.0, email.utils.mktime_tz(parsed) - time.time())
+
+
+def retryable(method, status):
+    """Test if request may be repeated; status None denotes a connection error.
+
+    Requests with side effects are only repeated when the server refused them
+    outright (429 or 503), anything else is repeated on connection errors and
+    transient server errors.
+    """
+    if method in IDEMPOTENT:
+        return status is None or status in TRANSIENT
+    return status in REFUSED
+
+
+class RetryPolicy(object):
+    """Exponential backoff with full jitter honouring Retry-After up to limit seconds."""
+
+    def __init__(self, attempts=3, base=0.5, cap=10.0, limit=30.0):
+        self.attempts = attempts
+        self.base = base
+        self.cap = cap
+        self.limit = limit
+
+    def delay(self, attempt, after=None):
+        """Return seconds to wait before retry attempt (0 based) or None when retrying is pointless."""
+        if attempt >= self.attempts:
+            return None
+        if after is not None:
+            return after if after <= self.limit else None
+        return random.uniform(0, min(self.cap, self.base * 2 ** attempt))
+
+
+class CircuitBreaker(object):
+    """Stop sending requests after consecutive failures until a probe succeeds.
+
+    After threshold failures in a row, or at once when the server asks to back
+    off for longer than a retry would wait, the circuit opens for cooldown
+    seconds. Once that time has passed a single caller is allowed to probe;
+    success closes the circuit, failure opens it again with twice the
+    cooldown up to maximum seconds.
+    """
+
+    def __init__(self, threshold=5, cooldown=15.0, maximum=600.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.maximum = maximum
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.opened = None
+        self.wait = cooldown
+        self.probing = False
+        self.reason = ''
+
+    @property
+    def closed(self):
+        """Test if requests may be sent."""
+        return self.opened is None
+
+    def remaining(self):
+        """Return seconds until next probe, 0 when closed or due."""
+        with self.lock:
+            if self.opened is None:
+                return 0.0
+            return max(0.0, self.opened + self.wait - time.time())
+
+    def probe(self):
+        """Return True for the one caller that should probe now."""
+        with self.lock:
+            if self.opened is None or self.probing or time.time() < self.opened + self.wait:
+                return False
+            self.probing = True
+            return True
+
+    def success(self):
+        """Record successful request; return True when this closed an open circuit."""
+        with self.lock:
+            reopened = self.opened is not None
+            self.failures, self.opened, self.wait, self.probing = 0, None, self.cooldown, False
+            return reopened
+
+    def failure(self, reason, wait=None):
+        """Record failed request; return True when this opened the circuit."""
+        with self.lock:
+            self.failures += 1
+            if self.opened is not None:
+                if not self.probing:
+                    return False
+                self.wait = min(self.maximum, max(self.wait * 2, wait or 0))
+            elif self.failures >= self.threshold or wait is not None:
+                self.wait = min(self.maximum, max(self.cooldown, wait or 0))
+            else:
+                return False
+            self.opened, self.probing, self.reason = time.time(), False, reason
+            return True
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+
+
+"""gigasetelements.scheduler: persisted one-shot and recurring jobs run inside a long running process."""
+
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+
+import datetime
+import heapq
+import itertools
+import threading
+import time
+import uuid
+
+from . import jsonlib
+from .utils import filelock, write_private
+
+
+def next_clock(clock, after=None):
+    """Return first epoch later than after (default now) at which local time is HH:MM."""
+    hour, minute = [int(part) for part in clock.split(':')]
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        raise ValueError('invalid time ' + clock)
+    now = datetime.datetime.fromtimestamp(time.time() if after is None else after)
+    due = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if due <= now:
+        due += datetime.timedelta(days=1)
+    return time.mktime(due.timetuple())
+
+
+def parse_repeat(repeat):
+    """Return None, 'daily' or number of seconds between runs."""
+    if repeat in (None, '', 0):
+        return None
+    if repeat == 'daily':
+        return repeat
+    seconds = float(repeat)
+    if seconds < 1:
+        raise ValueError('repeat must be daily or at least 1 second')
+    return seconds
+
+
+class Scheduler(object):
+    """Heap of jobs due at an epoch, fired on a background thread.
+
+    A job is a dict with id, action, params, due and repeat where repeat is
+    None for one-shot jobs, 'daily' to fire at the same local time every day
+    or a number of seconds. run(action, params) executes a job. Jobs are
+    persisted to fileloc on every change so they survive restarts; one-shot
+    jobs overdue by more than grace seconds are dropped and recurring jobs
+    skip missed runs. warn(job, error) is called when run raised.
+    """
+
+    def __init__(self, fileloc, run, grace=300, warn=None):
+        self.fileloc = fileloc
+        self.run = run
+        self.grace = grace
+        self.warn = warn
+        self.jobs = {}
+        self.heap = []
+        self.counter = itertools.count()
+        self.cond = threading.Condition()
+        self.stopped = False
+        self.thread = threading.Thread(target=self.loop, name='scheduler')
+        self.thread.daemon = True
+        self.load()
+
+    def load(self):
+        """Read persisted jobs."""
+        try:
+            with open(self.fileloc, 'r') as target:
+                jobs = jsonlib.loads(target.read())
+        except (IOError, OSError, ValueError):
+            return
+        now = time.time()
+        with self.cond:
+            for job in jobs if isinstance(jobs, list) else []:
+                if job['due'] < now - self.grace:
+                    if job.get('repeat') is None:
+                        continue
+                    job['due'] = self.following(job, now)
+                self.push(job)
+
+    def save(self):
+        """Persist jobs; caller holds lock."""
+        try:
+            with filelock(self.fileloc):
+                write_private(self.fileloc, jsonlib.dumps(sorted(self.jobs.values(), key=lambda job: job['due'])))
+        except (IOError, OSError):
+            pass
+
+    def push(self, job):
+        """Register job and wake loop; caller holds lock."""
+        self.jobs[job['id']] = job
+        heapq.heappush(self.heap, (job['due'], next(self.counter), job['id']))
+        self.cond.notify()
+
+    @staticmethod
+    def following(job, now):
+        """Return next due time of recurring job after now."""
+        if job['repeat'] == 'daily':
+            return next_clock(time.strftime('%H:%M', time.localtime(job['due'])), now)
+        missed = max(0, (now - job['due']) // job['repeat'] + 1)
+        return job['due'] + missed * job['repeat']
+
+    def add(self, action, params, due, repeat=None):
+        """Schedule action at epoch due and return job."""
+        job = {'id': uuid.uuid4().hex[:8], 'action': action, 'params': params or {}, 'due': float(due), 'repeat': parse_repeat(repeat)}
+        with self.cond:
+            self.push(job)
+            self.save()
+        return job
+
+    def remove(self, job_id=None):
+        """Remove job or all jobs when job_id is None and return removed jobs."""
+        with self.cond:
+            removed = [self.jobs.pop(key) for key in (list(self.jobs) if job_id is None else [job_id]) if key in self.jobs]
+            if removed:
+                self.save()
+        return removed
+
+    def list(self):
+        """Return jobs ordered on due time."""
+        with self.cond:
+            return sorted((dict(job) for job in self.jobs.values()), key=lambda job: job['due'])
+
+    def take(self):
+        """Wait for and return next due job, None when stopped."""
+        with self.cond:
+            while not self.stopped:
+                while self.heap and self.jobs.get(self.heap[0][2], {}).get('due') != self.heap[0][0]:
+                    heapq.heappop(self.heap)
+                delay = self.heap[0][0] - time.time() if self.heap else None
+                if delay is not None and delay <= 0:
+                    job = self.jobs[heapq.heappop(self.heap)[2]]
+                    if job['repeat'] is None:
+                        del self.jobs[job['id']]
+                    else:
+                        job['due'] = self.following(job, time.time())
+                        heapq.heappush(self.heap, (job['due'], next(self.counter), job['id']))
+                    self.save()
+                    return job
+                self.cond.wait(delay)
+        return None
+
+    def loop(self):
+        """Fire jobs until stopped."""
+        while 1:
+            job = self.take()
+            if job is None:
+                return
+            try:
+                self.run(job['action'], job['params'])
+            except Exception as error:  # pylint: disable=broad-except
+                if self.warn is not None:
+                    self.warn(job, error)
+
+    def start(self):
+        """Start scheduler thread."""
+        self.thread.start()
+        return self
+
+    def stop(self, timeout=10):
+        """Stop scheduler thread."""
+        with self.cond:
+            self.stopped = True
+            self.cond.notify()
+        if self.thread.is_alive():
+            self.thread.join(timeout)
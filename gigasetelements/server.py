@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+
+
+"""gigasetelements.server: local JSON API over localhost HTTP or a Unix socket and its client."""
+
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+
+import errno
+import hmac
+import os
+import socket
+import stat
+import threading
+
+try:
+    from urllib.parse import urlparse, parse_qsl, urlencode
+    from http.client import HTTPConnection
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn, UnixStreamServer
+except ImportError:
+    from urlparse import urlparse, parse_qsl
+    from urllib import urlencode
+    from httplib import HTTPConnection
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn, UnixStreamServer
+
+from . import jsonlib
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Turn requests into dispatch(method, name, params) calls answered with JSON.
+
+    When the server has a token every request must carry it as bearer token.
+    Write requests take their parameters from a JSON body only, which a
+    cross-site form post cannot send.
+    """
+
+    def authorized(self):
+        """Test bearer token when server requires one."""
+        if self.server.token is None:
+            return True
+        scheme, _, token = (self.headers.get('Authorization') or '').partition(' ')
+        return scheme.lower() == 'bearer' and hmac.compare_digest(token.strip().encode('utf-8'), self.server.token.encode('utf-8'))
+
+    def answer(self, method):
+        """Parse request, dispatch it and send JSON response."""
+        if not self.authorized():
+            return self.reply(401, {'error': 'missing or invalid token'})
+        parts = urlparse(self.path)
+        if method == 'get':
+            params = dict(parse_qsl(parts.query))
+        elif parts.query:
+            return self.reply(400, {'error': 'parameters must be sent as JSON body'})
+        elif (self.headers.get('Content-Type') or '').split(';')[0].strip().lower() != 'application/json':
+            return self.reply(415, {'error': 'Content-Type must be application/json'})
+        else:
+            try:
+                params = jsonlib.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+            except ValueError:
+                params = None
+            if not isinstance(params, dict):
+                return self.reply(400, {'error': 'body must be a JSON object'})
+        code, result = self.server.dispatch(method, parts.path.strip('/'), params)
+        return self.reply(code, result)
+
+    def reply(self, code, result):
+        """Send result as JSON."""
+        body = jsonlib.dumps(result).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Answer read request."""
+        self.answer('get')
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """Answer write request."""
+        self.answer('post')
+
+    def address_string(self):
+        return 'local'
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        return
+
+
+class LocalHTTPServer(ThreadingMixIn, HTTPServer):
+    """Threaded HTTP server."""
+
+    daemon_threads = True
+    request_queue_size = 64
+
+
+class UnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    """Threaded HTTP server on a Unix socket readable by owner only."""
+
+    daemon_threads = True
+    request_queue_size = 64
+
+    def server_bind(self):
+        if os.path.lexists(self.server_address):
+            if not stat.S_ISSOCK(os.lstat(self.server_address).st_mode):
+                raise OSError(errno.EEXIST, 'refusing to replace file that is not a socket', self.server_address)
+            os.remove(self.server_address)
+        umask = os.umask(0o177)
+        try:
+            UnixStreamServer.server_bind(self)
+        finally:
+            os.umask(umask)
+        self.server_name, self.server_port = 'localhost', 0
+
+
+def serve(address, dispatch, token=None):
+    """Serve dispatch on localhost port when address is a number, else on Unix socket path, from a background thread."""
+    if str(address).isdigit():
+        server = LocalHTTPServer(('127.0.0.1', int(address)), Handler)
+    else:
+        server = UnixHTTPServer(address, Handler)
+    server.dispatch = dispatch
+    server.token = token
+    thread = threading.Thread(target=server.serve_forever, name='server')
+    thread.daemon = True
+    thread.start()
+    return server
+
+
+class UnixHTTPConnection(HTTPConnection):
+    """HTTP connection over a Unix socket."""
+
+    def __init__(self, path, timeout=30):
+        HTTPConnection.__init__(self, 'localhost', timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+def call(address, method, name, params=None, timeout=30, token=None):
+    """Invoke action on server and return (status code, decoded result)."""
+    if str(address).isdigit():
+        connection = HTTPConnection('127.0.0.1', int(address), timeout=timeout)
+    else:
+        connection = UnixHTTPConnection(address, timeout=timeout)
+    path, body, headers = '/' + name, None, {}
+    if token is not None:
+        headers['Authorization'] = 'Bearer ' + token
+    if method == 'get':
+        if params:
+            path += '?' + urlencode(params)
+    else:
+        body = jsonlib.dumps(params or {}).encode('utf-8')
+        headers['Content-Type'] = 'application/json'
+    try:
+        connection.request(method.upper(), path, body, headers)
+        response = connection.getresponse()
+        return response.status, jsonlib.loads(response.read())
+    finally:
+        connection.close()
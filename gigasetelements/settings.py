@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+
+"""gigasetelements.settings: merge intrusion setting changes into one update."""
+
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+
+import collections
+
+
+class IntrusionSettings(object):
+    """Collect modus and per mode intrusion setting changes for a single basestation write."""
+
+    def __init__(self):
+        self.active_mode = None
+        self.modes = collections.OrderedDict()
+        self.messages = []
+
+    def __bool__(self):
+        return self.active_mode is not None or bool(self.modes)
+
+    __nonzero__ = __bool__
+
+    def activate(self, modus):
+        """Select active modus."""
+        self.active_mode = modus
+
+    def update(self, moduslist, **values):
+        """Change settings of every modus in list."""
+        for modus in moduslist:
+            self.modes.setdefault(modus, {}).update(values)
+
+    def payload(self):
+        """Return all changes merged into one intrusion_settings object."""
+        settings = {}
+        if self.active_mode is not None:
+            settings['active_mode'] = self.active_mode
+        if self.modes:
+            settings['modes'] = [{modus: dict(values)} for modus, values in self.modes.items()]
+        return {'intrusion_settings': settings}
+
+    def payloads(self):
+        """Yield the same changes as payload() one setting per object."""
+        if self.active_mode is not None:
+            yield {'intrusion_settings': {'active_mode': self.active_mode}}
+        for modus, values in self.modes.items():
+            for key, value in values.items():
+                yield {'intrusion_settings': {'modes': [{modus: {key: value}}]}}
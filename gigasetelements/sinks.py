@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+
+
+"""gigasetelements.sinks: forward monitored events to files, webhooks and MQTT brokers."""
+
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+
+import io
+import re
+import sys
+import time
+
+try:
+    from urllib.parse import urlparse, parse_qsl
+except ImportError:
+    from urlparse import urlparse, parse_qsl
+
+import requests
+
+from . import jsonlib
+from .workers import QueueWorker
+
+
+DROPS = ('oldest', 'newest', 'block')
+
+
+class Sink(QueueWorker):
+    """Deliver event records in batches from a bounded queue on a background thread.
+
+    The poll loop only queues records; when a slow sink lets its queue fill
+    up drop decides whether the oldest or the newest record is discarded or
+    whether queueing blocks until there is room. warn(sink, message) is
+    called when a batch could not be delivered.
+    """
+
+    kind = 'sink'
+
+    def __init__(self, target, maxsize=1000, batch=100, drop='oldest', linger=0, warn=None):
+        QueueWorker.__init__(self, 'sink-' + self.kind, maxsize=maxsize, batch=batch, drop=drop, linger=linger)
+        self.target = target
+        self.warn = warn
+        self.delivered = 0
+
+    def handle(self, items):
+        self.write(items)
+        self.delivered += len(items)
+
+    def write(self, records):
+        """Deliver batch of records; subclasses override, the base sink discards them."""
+        return
+
+    def failed(self, items):
+        QueueWorker.failed(self, items)
+        if self.warn is not None:
+            self.warn(self, str(sys.exc_info()[1]) + ', ' + str(len(items)) + ' event(s) lost')
+
+    def close(self):
+        """Release resources after the queue is drained."""
+        return
+
+    def stop(self, timeout=10):
+        QueueWorker.stop(self, timeout)
+        self.close()
+
+
+class FileSink(Sink):
+    """Append records as NDJSON lines."""
+
+    kind = 'file'
+
+    def __init__(self, target, **options):
+        Sink.__init__(self, target, **options)
+        self.stream = io.open(target, 'a', encoding='utf-8')
+
+    def write(self, records):
+        self.stream.write(''.join(jsonlib.dumps(record) + '\n' for record in records))
+        self.stream.flush()
+
+    def close(self):
+        self.stream.close()
+
+
+class WebhookSink(Sink):
+    """POST batches of records as JSON array, retrying failed deliveries with backoff."""
+
+    kind = 'webhook'
+
+    def __init__(self, target, timeout=10, attempts=3, **options):
+        Sink.__init__(self, target, **options)
+        self.timeout = timeout
+        self.attempts = attempts
+        self.session = requests.Session()
+
+    def write(self, records):
+        body = jsonlib.dumps(records)
+        for attempt in range(self.attempts):
+            try:
+                response = self.session.post(self.target, data=body.encode('utf-8'), headers={'Content-Type': 'application/json'},
+                                             timeout=self.timeout)
+                if response.status_code < 500:
+                    response.raise_for_status()
+                    return
+                error = requests.HTTPError(str(response.status_code) + ' ' + response.reason)
+            except requests.exceptions.ConnectionError as exc:
+                error = exc
+            except requests.exceptions.Timeout as exc:
+                error = exc
+            if attempt + 1 < self.attempts:
+                time.sleep(2 ** attempt)
+        raise error
+
+    def close(self):
+        self.session.close()
+
+
+class MqttSink(Sink):
+    """Publish every record as JSON to a topic which may hold {type}, {group}, {device} or other record fields."""
+
+    kind = 'mqtt'
+
+    def __init__(self, target, module, qos=0, retain=False, **options):
+        Sink.__init__(self, target, **options)
+        parts = urlparse(target)
+        self.topic = parts.path.lstrip('/') or 'gigasetelements/{group}/{type}'
+        self.qos = qos
+        self.retain = retain
+        if hasattr(module, 'CallbackAPIVersion'):
+            self.client = module.Client(module.CallbackAPIVersion.VERSION2)
+        else:
+            self.client = module.Client()
+        if parts.username:
+            self.client.username_pw_set(parts.username, parts.password)
+        self.client.connect_async(parts.hostname or 'localhost', parts.port or 1883)
+        self.client.loop_start()
+
+    def write(self, records):
+        pending = [self.client.publish(self.topic.format(**record), jsonlib.dumps(record), qos=self.qos, retain=self.retain) for record in records]
+        if self.qos:
+            for message in pending:
+                message.wait_for_publish(30)
+
+    def close(self):
+        self.client.loop_stop()
+        self.client.disconnect()
+
+
+def redact(target):
+    """Return target without credentials."""
+    return re.sub('//[^/@]*@', '//', target)
+
+
+def parse_spec(spec):
+    """Split sink specification into kind, target and options.
+
+    Targets are mqtt://[user:pass@]host[:port]/topic, http(s)://url or a file
+    path (optionally file:path). Queue options follow a # as in
+    http://host/hook#drop=newest&size=500&batch=50&linger=1.
+    """
+    target, _, fragment = spec.partition('#')
+    options = {}
+    for key, value in parse_qsl(fragment):
+        if key == 'drop':
+            if value not in DROPS:
+                raise ValueError('drop must be one of ' + ', '.join(DROPS))
+            options['drop'] = value
+        elif key in ('size', 'batch'):
+            options['maxsize' if key == 'size' else key] = int(value)
+        elif key in ('linger', 'timeout'):
+            options[key] = float(value)
+        elif key == 'qos':
+            options[key] = int(value)
+        elif key == 'retain':
+            options[key] = value.lower() in ('1', 'true', 'yes')
+        else:
+            raise ValueError('unknown option ' + key)
+    scheme = urlparse(target).scheme.lower()
+    if scheme in ('http', 'https'):
+        kind = 'webhook'
+    elif scheme == 'mqtt':
+        kind = 'mqtt'
+    else:
+        kind, target = 'file', re.sub('^file:(//)?', '', target)
+    if ('qos' in options or 'retain' in options) and kind != 'mqtt':
+        raise ValueError('qos and retain apply to mqtt only')
+    if 'timeout' in options and kind != 'webhook':
+        raise ValueError('timeout applies to webhooks only')
+    return kind, target, options
@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+
+
+"""gigasetelements.timeseries: compact append-only time series with rollups.
+
+Every series lives in one file per tier holding fixed width little endian
+records with timestamps in seconds and values stored as 16 bit integers in
+tenths: (timestamp, value) for raw samples and (timestamp, minimum, maximum,
+average, count) for rollups. Raw samples are kept for a week, five minute
+rollups for a month and hourly rollups for good, so a year of per minute
+samples costs about 300 KB per series. Files are read through mmap and
+searched with bisect, a query never loads a whole file.
+"""
+
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+
+import bisect
+import json
+import mmap
+import os
+import re
+import struct
+
+from .utils import write_private
+
+RAW = struct.Struct('<Ih')
+ROLLUP = struct.Struct('<IhhhH')
+
+SCALE = 10.0
+
+TIERS = (('raw', 0, 7 * 86400), ('5m', 300, 30 * 86400), ('1h', 3600, None))
+
+UNSAFE = re.compile(r'[^\w.-]')
+
+
+def scaled(value):
+    """Return value as tenths clamped to 16 bit range."""
+    return max(-32768, min(32767, int(round(value * SCALE))))
+
+
+class Records(object):
+    """Read only sequence view of a tier file exposing timestamps for bisect."""
+
+    def __init__(self, fileloc, layout):
+        self.layout = layout
+        self.target = self.view = None
+        self.length = 0
+        try:
+            self.target = open(fileloc, 'rb')
+            size = os.fstat(self.target.fileno()).st_size
+            if size >= layout.size:
+                self.view = mmap.mmap(self.target.fileno(), 0, access=mmap.ACCESS_READ)
+                self.length = size // layout.size
+        except (IOError, OSError):
+            pass
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        return self.layout.unpack_from(self.view, index * self.layout.size)[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def record(self, index):
+        """Return record at index as (timestamp, minimum, maximum, average, count)."""
+        record = self.layout.unpack_from(self.view, index * self.layout.size)
+        if self.layout is RAW:
+            return record[0], record[1], record[1], record[1], 1
+        return record
+
+    def between(self, from_ts, to_ts):
+        """Yield records with from_ts <= timestamp < to_ts."""
+        for index in range(bisect.bisect_left(self, from_ts), bisect.bisect_left(self, to_ts)):
+            yield self.record(index)
+
+    def close(self):
+        """Release mapping and file."""
+        if self.view is not None:
+            self.view.close()
+        if self.target is not None:
+            self.target.close()
+
+
+def aggregate(records):
+    """Combine records into (minimum, maximum, average, count) in tenths or None."""
+    low = high = None
+    total = count = 0
+    for _, minimum, maximum, average, number in records:
+        low = minimum if low is None else min(low, minimum)
+        high = maximum if high is None else max(high, maximum)
+        total += average * number
+        count += number
+    if not count:
+        return None
+    return low, high, int(round(total / count)), count
+
+
+class Series(object):
+    """One measured value of one device stored in a file per tier."""
+
+    def __init__(self, base):
+        self.base = base
+        self.last = None
+        with Records(self.fileloc('raw'), RAW) as records:
+            if len(records):
+                self.last = records[len(records) - 1]
+
+    def fileloc(self, tier):
+        """Return file holding tier."""
+        return self.base + '.' + tier
+
+    @staticmethod
+    def layout(tier):
+        """Return record layout of tier."""
+        return RAW if tier == 'raw' else ROLLUP
+
+    def records(self, tier):
+        """Return mapped records of tier."""
+        return Records(self.fileloc(tier), self.layout(tier))
+
+    def write(self, tier, record):
+        """Append record to tier."""
+        handle = os.open(self.fileloc(tier), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        with os.fdopen(handle, 'ab') as target:
+            target.write(self.layout(tier).pack(*record))
+
+    def append(self, stamp, value):
+        """Add sample rolling up finished buckets; samples not newer than the last one are ignored."""
+        stamp = int(stamp)
+        if self.last is not None and stamp <= self.last:
+            return False
+        if self.last is not None:
+            for (tier, width, _), (source, _, _) in zip(TIERS[1:], TIERS[:-1]):
+                if stamp // width == self.last // width:
+                    break
+                start = self.last // width * width
+                with self.records(source) as records:
+                    rollup = aggregate(records.between(start, start + width))
+                if rollup is not None:
+                    self.write(tier, (start,) + rollup[:3] + (min(rollup[3], 65535),))
+                    self.expire(tier, stamp)
+            self.expire('raw', stamp)
+        self.write('raw', (stamp, scaled(value)))
+        self.last = stamp
+        return True
+
+    def expire(self, tier, now):
+        """Drop records beyond retention once a quarter of the retention has piled up."""
+        retention = dict((name, keep) for name, _, keep in TIERS)[tier]
+        if retention is None:
+            return
+        with self.records(tier) as records:
+            if not len(records) or records[0] >= now - retention * 5 // 4:
+                return
+            first = bisect.bisect_left(records, now - retention)
+            keep = records.view[first * records.layout.size:len(records) * records.layout.size]
+        write_private(self.fileloc(tier), keep)
+
+    def query(self, from_ts, to_ts):
+        """Return dict with min, max, avg and count over range using the finest tier reaching back far enough.
+
+        Buckets not rolled up yet are filled in from the finer tiers.
+        """
+        firsts = []
+        for tier, _, _ in TIERS:
+            with self.records(tier) as records:
+                if len(records):
+                    firsts.append((tier, records[0]))
+        if not firsts:
+            return None
+        covering = [tier for tier, first in firsts if first <= from_ts]
+        tier = covering[0] if covering else min(firsts, key=lambda item: item[1])[0]
+        parts = []
+        start = from_ts
+        for name, width, _ in reversed(TIERS[:[entry[0] for entry in TIERS].index(tier) + 1]):
+            with self.records(name) as records:
+                end = to_ts if not width else min(to_ts, records[len(records) - 1] + width) if len(records) else start
+                if end > start:
+                    parts.extend(records.between(start, end))
+                    start = end
+        result = aggregate(parts)
+        if result is None:
+            return None
+        return {'min': result[0] / SCALE, 'max': result[1] / SCALE, 'avg': result[2] / SCALE, 'count': result[3], 'tier': tier}
+
+
+class TimeSeries(object):
+    """Directory of series keyed on device id and metric with a name index."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.series = {}
+        self.names = {}
+        if not os.path.isdir(directory):
+            os.makedirs(directory, 0o700)
+        try:
+            with open(os.path.join(directory, 'names.json'), 'r') as target:
+                self.names = json.load(target)
+        except (IOError, OSError, ValueError):
+            pass
+
+    def key(self, device, metric):
+        """Return file base of series."""
+        return os.path.join(self.directory, UNSAFE.sub('_', device.lower()) + '.' + metric)
+
+    def record(self, device, name, metric, stamp, value):
+        """Append sample of metric of device."""
+        if self.names.get(device) != name:
+            self.names[device] = name
+            write_private(os.path.join(self.directory, 'names.json'), json.dumps(self.names, indent=1, sort_keys=True))
+        base = self.key(device, metric)
+        if base not in self.series:
+            self.series[base] = Series(base)
+        return self.series[base].append(stamp, value)
+
+    def lookup(self, key):
+        """Return device ids matching id or name ignoring case."""
+        key = key.lower()
+        return sorted(device for device, name in self.names.items() if key in (device.lower(), name.lower()))
+
+    def metrics(self, device):
+        """Return metrics recorded for device."""
+        prefix = UNSAFE.sub('_', device.lower()) + '.'
+        return sorted(set(entry[len(prefix):].rsplit('.', 1)[0] for entry in os.listdir(self.directory) if entry.startswith(prefix)))
+
+    def query(self, device, metric, from_ts, to_ts):
+        """Return statistics of metric of device over range."""
+        return Series(self.key(device, metric)).query(from_ts, to_ts)
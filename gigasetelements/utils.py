@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+
+
+"""gigasetelements.utils: file helpers shared by state keeping modules."""
+
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+
+import os
+import contextlib
+
+if os.name == 'posix':
+    import fcntl
+
+
+@contextlib.contextmanager
+def filelock(fileloc):
+    """Hold an exclusive advisory lock next to given file for the duration of the block."""
+    handle = os.open(fileloc + '.lock', os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        if os.name == 'posix':
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(handle)
+
+
+def write_atomic(fileloc, content, mode=0o644):
+    """Atomically replace file with content using given permissions."""
+    tmpfile = fileloc + '.tmp'
+    handle = os.open(tmpfile, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode)
+    with os.fdopen(handle, 'wb' if isinstance(content, bytes) else 'w') as target:
+        target.write(content)
+    getattr(os, 'replace', os.rename)(tmpfile, fileloc)
+    return
+
+
+def write_private(fileloc, content):
+    """Atomically replace file with content readable by owner only."""
+    write_atomic(fileloc, content, 0o600)
+    return
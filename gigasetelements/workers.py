@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+
+"""gigasetelements.workers: background queue consumers."""
+
+from __future__ import (absolute_import, division, print_function, unicode_literals)
+
+import threading
+import time
+
+try:
+    from queue import Queue, Empty, Full
+except ImportError:
+    from Queue import Queue, Empty, Full
+
+
+STOP = object()
+
+
+class QueueWorker(object):
+    """Consume queued items in batches on a daemon thread.
+
+    With maxsize 0 the queue is unbounded. Otherwise drop decides what happens
+    when it is full: 'block' waits for room, 'newest' discards the offered item
+    and 'oldest' discards the longest waiting item. With linger set a batch is
+    held open for that many seconds after its first item to collect bursts.
+    """
+
+    def __init__(self, name, maxsize=0, batch=100, drop='block', linger=0):
+        self.queue = Queue(maxsize)
+        self.batch = batch
+        self.linger = linger
+        self.drop = drop
+        self.dropped = 0
+        self.thread = threading.Thread(target=self.run, name=name)
+        self.thread.daemon = True
+
+    def start(self):
+        """Start consumer thread."""
+        self.thread.start()
+        return self
+
+    def put(self, item):
+        """Queue item applying drop policy when full."""
+        if self.drop == 'block':
+            self.queue.put(item)
+            return
+        while 1:
+            try:
+                self.queue.put_nowait(item)
+                return
+            except Full:
+                self.dropped += 1
+                if self.drop == 'newest':
+                    return
+                try:
+                    self.queue.get_nowait()
+                except Empty:
+                    pass
+
+    def run(self):
+        """Hand queued items to handle() in batches until stopped."""
+        while 1:
+            items = [self.queue.get()]
+            deadline = time.time() + self.linger
+            while len(items) < self.batch and items[-1] is not STOP:
+                try:
+                    if self.linger:
+                        items.append(self.queue.get(timeout=max(0, deadline - time.time())))
+                    else:
+                        items.append(self.queue.get_nowait())
+                except Empty:
+                    break
+            stop = STOP in items
+            items = [item for item in items if item is not STOP]
+            if items:
+                try:
+                    self.handle(items)
+                except Exception:  # pylint: disable=broad-except
+                    self.failed(items)
+            if stop:
+                return
+
+    def handle(self, items):
+        """Process batch of items; subclasses override, the base worker discards them."""
+        return
+
+    def failed(self, items):
+        """Called when handle() raised; batch is discarded by default."""
+        self.dropped += len(items)
+
+    def stop(self, timeout=10):
+        """Process remaining items and stop consumer thread."""
+        if self.thread.is_alive():
+            self.queue.put(STOP)
+            self.thread.join(timeout)
@@ -5,6 +5,7 @@
 """Install routine for gigasetelements command-line interface."""
 
 import os
+import sys
 import codecs
 from setuptools import setup, find_packages
 
@@ -17,6 +18,9 @@ with codecs.open(os.path.join(HERE, 'DESCRIPTION.rst'), encoding='utf-8') as f:
 
 packagelist = ['future', 'requests', 'pushbullet.py', 'unidecode', 'colorama', 'configargparse']
 
+if sys.version_info[0] < 3:
+    packagelist.append('futures')
+
 if os.name == 'posix':
     packagelist.append('python-crontab')
     packagelist.append('daemonize')
@@ -49,6 +53,7 @@ setup(
     keywords='Home Automation, Home Security, Internet of Things (IoT)',
     packages=find_packages(exclude=['contrib', 'docs', 'tests*']),
     install_requires=packagelist,
+    extras_require={'fast': ['orjson; python_version >= "3.6"', 'ujson'], 'mqtt': ['paho-mqtt']},
 
     entry_points={
         'console_scripts': [